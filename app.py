@@ -1,8 +1,12 @@
-from flask import Flask, render_template, redirect, url_for, flash
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
 from flask_jwt_extended import JWTManager, set_access_cookies, unset_jwt_cookies, jwt_required
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
-from flasgger import Swagger
+from services.password_hasher import HashPoolBusy
+from connector.db import Base, engine, init_app as init_db_session
+from services import metrics
+from utils import apidoc
+from utils.fast_json import error_response
 import os
 
 # Load environment variables
@@ -15,23 +19,39 @@ app.config['JWT_SECRET_KEY'] = os.getenv("JWT_SECRET_KEY", "jwt_secret_key")
 app.config['JWT_TOKEN_LOCATION'] = ['cookies']
 app.config['JWT_COOKIE_SECURE'] = False  # Change to True for production with HTTPS
 app.config['JWT_COOKIE_CSRF_PROTECT'] = False
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", "sqlite:///bank.db")
+app.config['SQLALCHEMY_DATABASE_URI'] = engine.url.render_as_string(hide_password=False)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-swagger = Swagger(app)
+# Swagger UI and the spec endpoint; None when APIDOCS_ENABLED is off
+swagger = apidoc.init_app(app)
+
+class SharedEngineSQLAlchemy(SQLAlchemy):
+    # Hand Flask-SQLAlchemy the connector's engine instead of letting it build a
+    # second, untuned pool for the same database
+    def _make_engine(self, bind_key, options, app):
+        return engine
+
 
 # Initialize database and JWT
-db = SQLAlchemy(app)
+db = SharedEngineSQLAlchemy(app, metadata=Base.metadata)
 jwt = JWTManager(app)
+init_db_session(app)
+metrics.init_app(app)
 
 # Import blueprints and routes
 from controller.user_controller import user_controller
 from controller.account_controller import account_controller
 from controller.transaction_controller import transaction_controller
+from controller.ops_controller import ops_controller
+from controller.metrics_controller import metrics_controller
+from controller.api_v2_controller import api_v2_controller
 
 # Register blueprints
 app.register_blueprint(user_controller, url_prefix='/users')
 app.register_blueprint(account_controller, url_prefix='/accounts')
 app.register_blueprint(transaction_controller, url_prefix='/transactions')
+app.register_blueprint(ops_controller, url_prefix='/ops')
+app.register_blueprint(metrics_controller)
+app.register_blueprint(api_v2_controller, url_prefix='/api/v2')
 
 # Home Route
 @app.route('/')
@@ -46,9 +66,19 @@ def dashboard():
 # Error Handling
 @app.errorhandler(404)
 def page_not_found(e):
+    if request.path.startswith('/api/'):
+        return error_response(404, 'not_found', 'No such endpoint')
     flash("Page not found", "danger")
     return redirect(url_for('home'))
 
+@app.errorhandler(HashPoolBusy)
+def hash_pool_busy(e):
+    # Password hashing is saturated: shed the request instead of queueing it
+    message = "Server is busy, please try again shortly."
+    if request.is_json:
+        return jsonify({'error': message}), 503, {'Retry-After': '1'}
+    return message, 503, {'Retry-After': '1'}
+
 # Run app
 if __name__ == "__main__":
     with app.app_context():
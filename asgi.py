@@ -0,0 +1,154 @@
+# Async serving mode. The routes in ASYNC_ENDPOINTS run on the event loop with
+# their database work on an sqlalchemy.ext.asyncio engine, so one process can
+# keep hundreds of requests waiting on the database at once. Everything else is
+# served by the regular WSGI app on asgiref's thread pool.
+#
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# The views themselves are the same Flask views: each one runs through Flask's
+# normal dispatch inside AsyncSession.run_sync, where every query the sync code
+# issues is awaited on the async driver.
+import io
+import sys
+from asgiref.wsgi import WsgiToAsgi
+from flask import g
+from sqlalchemy import event
+from werkzeug.exceptions import HTTPException
+from app import app as flask_app
+from connector.async_db import AsyncSession, get_async_engine, dispose_async_engine, mark_event_loop, reset_event_loop
+from connector.db import _count_request_query
+from services import metrics
+
+ASYNC_ENDPOINTS = frozenset({
+    'account_controller.get_accounts',
+    'transaction_controller.get_transactions',
+    'transaction_controller.create_transaction',
+    'user_controller.get_profile',
+})
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+# Same SQL metrics and per-request query budget as the sync engines
+async_engine = get_async_engine()
+metrics.instrument_engine(async_engine.sync_engine, 'primary_async')
+event.listen(async_engine.sync_engine, 'before_cursor_execute', _count_request_query)
+
+
+def build_environ(scope, body):
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope['headers']:
+        name, value = raw_name.decode('latin1').upper().replace('-', '_'), raw_value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def async_endpoint(environ):
+    try:
+        endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return False
+    return endpoint in ASYNC_ENDPOINTS
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, response):
+    try:
+        body = b''.join(response.iter_encoded())
+    finally:
+        response.close()
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in response.headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def dispatch(environ):
+    # Flask's wsgi_app, with the request session on the async engine and the
+    # final commit awaited instead of run in the sync teardown
+    ctx = flask_app.request_context(environ)
+    token = mark_event_loop()
+    ctx.push()
+    error = None
+    try:
+        async with AsyncSession() as session:
+            def run(sync_session):
+                nonlocal error
+                g.db_session = sync_session
+                try:
+                    return flask_app.full_dispatch_request()
+                except Exception as e:
+                    error = e
+                    return flask_app.handle_exception(e)
+                finally:
+                    g.pop('db_session', None)
+
+            response = await session.run_sync(run)
+            if error is None:
+                await session.commit()
+            else:
+                await session.rollback()
+        return response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        reset_event_loop(token)
+        ctx.pop(error)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await dispose_async_engine()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return await wsgi_application(scope, receive, send)
+
+    body = await read_body(receive)
+    environ = build_environ(scope, body)
+    if not async_endpoint(environ):
+        # The body is already consumed, so replay it to the WSGI adapter
+        async def replay():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await wsgi_application(scope, replay, send)
+    await send_response(send, await dispatch(environ))
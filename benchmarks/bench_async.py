@@ -0,0 +1,159 @@
+# Compares the sync (gunicorn) and async (uvicorn + asgi.py) serving modes under
+# concurrent load. Each mode gets a real server process on the same seeded
+# database; a pool of client threads keeps --concurrency requests in flight
+# against the read routes and reports throughput and latency percentiles.
+#
+#   python -m benchmarks.bench_async --concurrency 200 --requests 5000
+#   python -m benchmarks.bench_async --database-url mysql+pymysql://... --concurrency 500
+#
+# Async mode needs uvicorn, asgiref and the async driver (aiosqlite for the
+# seeded SQLite file). Only read routes are driven: SQLite serializes writers,
+# which would measure the database's lock rather than the serving model.
+import argparse
+import http.client
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from benchmarks.bench_endpoints import prepare_database, percentile, git_revision, RESULTS_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTES = ('/accounts/accounts', '/transactions/transactions', '/users/users/me')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--transactions', type=int, default=200000)
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the cached seed database')
+    parser.add_argument('--database-url', help='Benchmark against this database instead of the seeded SQLite file')
+    parser.add_argument('--concurrency', type=int, default=100, help='Requests kept in flight')
+    parser.add_argument('--requests', type=int, default=2000, help='Timed requests per mode')
+    parser.add_argument('--workers', type=int, default=1, help='Server processes per mode')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', help='Where to write the results JSON (default benchmarks/results/async-<timestamp>.json)')
+    return parser.parse_args(argv)
+
+
+def server_command(mode, args):
+    bind = f'127.0.0.1:{args.port}'
+    if mode == 'sync':
+        return [sys.executable, '-m', 'gunicorn', '--bind', bind, '--workers', str(args.workers), 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(args.port),
+            '--workers', str(args.workers), '--log-level', 'warning']
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def drive(args, token):
+    # One keep-alive connection per client thread
+    local = threading.local()
+    headers = {'Cookie': f'access_token_cookie={token}', 'Connection': 'keep-alive'}
+
+    def one(i):
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            connection.request('GET', ROUTES[i % len(ROUTES)], headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            local.connection = None
+            status = 0
+        return (time.perf_counter() - started) * 1000, status
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        # Warm every connection before timing
+        list(pool.map(one, range(args.concurrency)))
+        started = time.perf_counter()
+        samples = list(pool.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+    latencies = [latency for latency, _ in samples]
+    errors = sum(1 for _, status in samples if status == 0 or status >= 500)
+    return {
+        'requests': args.requests,
+        'errors': errors,
+        'requests_per_second': round(args.requests / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        prepare_database(args, 'async-run.db')
+
+    from sqlalchemy import select, func
+    from app import app
+    from connector.db import engine
+    from flask_jwt_extended import create_access_token
+    from models.account import Account
+
+    with engine.connect() as connection:
+        user_id = connection.execute(
+            select(Account.user_id).group_by(Account.user_id).order_by(func.count().desc()).limit(1)
+        ).scalar()
+    with app.app_context():
+        token = create_access_token(identity=user_id)
+    engine.dispose()
+
+    results = {}
+    env = dict(os.environ, HASH_POOL_SIZE='0')
+    for mode in args.modes.split(','):
+        server = subprocess.Popen(server_command(mode, args), cwd=ROOT, env=env)
+        try:
+            wait_for_port(args.port)
+            results[mode] = drive(args, token)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+        r = results[mode]
+        print(f"{mode:6} {r['requests_per_second']:9.1f} req/s  p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  "
+              f"p99 {r['p99_ms']:8.2f}ms  errors {r['errors']}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'concurrency': args.concurrency,
+            'workers': args.workers,
+            'database': 'custom' if args.database_url else f'sqlite {args.users}/{args.accounts}/{args.transactions}',
+        },
+        'modes': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"async-{report['meta']['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# Drives every route of the user, account and transaction blueprints through
+# the Flask test client against a seeded SQLite database and reports latency
+# percentiles, SQL queries per request and peak Python memory per route.
+#
+#   python -m benchmarks.bench_endpoints --users 10000 --accounts 50000 --transactions 5000000
+#   python -m benchmarks.bench_endpoints --baseline benchmarks/results/before.json --threshold 0.2
+#
+# The seeded database is cached under benchmarks/.data and copied before each
+# run, so write-heavy routes never change the dataset other runs measure.
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '.data')
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+BLUEPRINTS = ('user_controller', 'account_controller', 'transaction_controller', 'api_v2_controller')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--transactions', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=50, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route before timing')
+    parser.add_argument('--memory-requests', type=int, default=5, help='Requests per route traced for peak memory')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the cached seed database')
+    parser.add_argument('--output', help='Where to write the results JSON (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative p95 slowdown before failing')
+    return parser.parse_args(argv)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_scenarios(ctx):
+    # endpoint -> callable(i) returning test client open() kwargs
+    user, accounts, spare = ctx['user'], ctx['accounts'], ctx['spare_accounts']
+    counter = ctx['run_id']
+    return {
+        'user_controller.register_user': lambda i: {'method': 'POST', 'path': '/users/register_user', 'data': {
+            'username': f'bench-{counter}-{i}', 'email': f'bench-{counter}-{i}@bench.local', 'password': 'benchpass'}},
+        'user_controller.login': lambda i: {'method': 'POST', 'path': '/users/login', 'data': {
+            'email': user['email'], 'password': 'benchpass'}},
+        'user_controller.get_profile': lambda i: {'method': 'GET', 'path': '/users/users/me'},
+        'user_controller.update_profile': lambda i: {'method': 'POST', 'path': '/users/users/me', 'data': {
+            'username': user['username'], 'email': user['email']}},
+        'user_controller.logout': lambda i: {'method': 'GET', 'path': '/users/logout'},
+        'account_controller.get_accounts': lambda i: {'method': 'GET', 'path': '/accounts/accounts'},
+        'account_controller.get_account': lambda i: {'method': 'GET', 'path': f'/accounts/accounts/{accounts[i % len(accounts)]}'},
+        'account_controller.edit_account': lambda i: {'method': 'GET', 'path': f'/accounts/accounts/{accounts[i % len(accounts)]}/edit'},
+        'account_controller.create_account': lambda i: {'method': 'POST', 'path': '/accounts/accounts', 'data': {
+            'account_type': 'savings', 'account_number': f'bench-{counter}-{i}', 'balance': '100'}},
+        'account_controller.update_account': lambda i: {'method': 'POST', 'path': f'/accounts/accounts/{accounts[i % len(accounts)]}', 'data': {
+            '_method': 'PUT', 'account_type': 'savings'}},
+        'account_controller.get_account_balance': lambda i: {'method': 'GET', 'path': f'/accounts/accounts/{accounts[i % len(accounts)]}/balance',
+            'query_string': {'at': '2024-01-01T00:00:00'} if i % 2 else {}},
+        'account_controller.delete_account': lambda i: {'method': 'POST', 'path': f'/accounts/accounts/accounts/{spare[i % len(spare)]}'},
+        'transaction_controller.get_transactions': lambda i: {'method': 'GET', 'path': '/transactions/transactions'},
+        'transaction_controller.get_transactions_json': lambda i: {'method': 'GET', 'path': '/transactions/transactions/json'},
+        'transaction_controller.get_transaction': lambda i: {'method': 'GET', 'path': f"/transactions/transactions/{ctx['transaction_id']}"},
+        'transaction_controller.create_transaction': lambda i: {'method': 'POST', 'path': '/transactions/transactions', 'data': {
+            'type': 'transfer', 'from_account_id': accounts[0], 'to_account_id': accounts[1], 'amount': '1.00',
+            'confirm_password': 'benchpass'}},
+        'transaction_controller.create_transactions_batch': lambda i: {'method': 'POST', 'path': '/transactions/transactions/batch', 'json': {
+            'confirm_password': 'benchpass',
+            'transactions': [{'type': 'deposit', 'to_account_id': accounts[k % len(accounts)], 'amount': '1.00'} for k in range(100)]}},
+        'transaction_controller.get_queued_transaction': lambda i: {'method': 'GET', 'path': f"/transactions/transactions/queue/{ctx['posting_id']}"},
+        'transaction_controller.revoke_transaction_grant': lambda i: {'method': 'POST', 'path': '/transactions/transactions/grant/revoke'},
+        'transaction_controller.get_transaction_summary': lambda i: {'method': 'GET', 'path': '/transactions/transactions/summary'},
+        'transaction_controller.export_transactions': lambda i: {'method': 'GET', 'path': '/transactions/transactions/export', 'query_string': {
+            'account_id': accounts[-1]}},
+        'api_v2_controller.get_me': lambda i: {'method': 'GET', 'path': '/api/v2/users/me'},
+        'api_v2_controller.list_accounts': lambda i: {'method': 'GET', 'path': '/api/v2/accounts'},
+        'api_v2_controller.get_account': lambda i: {'method': 'GET', 'path': f'/api/v2/accounts/{accounts[i % len(accounts)]}'},
+        'api_v2_controller.list_transactions': lambda i: {'method': 'GET', 'path': '/api/v2/transactions'},
+        'api_v2_controller.get_transaction': lambda i: {'method': 'GET', 'path': f"/api/v2/transactions/{ctx['transaction_id']}"},
+    }
+
+
+def prepare_database(args, run_name='run.db'):
+    # Copies the cached seed database (building it first if needed) to a fresh
+    # run file and points DATABASE_URL at it; returns the run file's path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    seed_path = os.path.join(DATA_DIR, f'seed-{args.users}-{args.accounts}-{args.transactions}.db')
+    run_path = os.path.join(DATA_DIR, run_name)
+    # The app reads its database from the environment at import time
+    os.environ['DATABASE_URL'] = f'sqlite:///{run_path}'
+    os.environ['POSTING_QUEUE_PATH'] = os.path.join(DATA_DIR, f'{run_name}.queue')
+
+    from sqlalchemy import create_engine
+    from benchmarks.seed import seed
+
+    if args.reseed or not os.path.exists(seed_path):
+        if os.path.exists(seed_path):
+            os.remove(seed_path)
+        started = time.perf_counter()
+        seed_engine = create_engine(f'sqlite:///{seed_path}')
+        seed(seed_engine, args.users, args.accounts, args.transactions)
+        seed_engine.dispose()
+        print(f"Seeded {seed_path} in {time.perf_counter() - started:.1f}s")
+    shutil.copyfile(seed_path, run_path)
+    return run_path
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    prepare_database(args)
+
+    from sqlalchemy import event, select, insert, func
+
+    from app import app
+    from connector.db import engine
+    from flask_jwt_extended import create_access_token
+    from models.account import Account
+    from models.transaction import Transaction
+    from models.user import User
+
+    with engine.begin() as connection:
+        # The hottest user: the one owning the most accounts
+        user_id = connection.execute(
+            select(Account.user_id).group_by(Account.user_id).order_by(func.count().desc()).limit(1)
+        ).scalar()
+        user = connection.execute(select(User.username, User.email).where(User.id == user_id)).mappings().one()
+        accounts = connection.execute(select(Account.id).where(Account.user_id == user_id).order_by(Account.id)).scalars().all()
+        transaction_id = connection.execute(
+            select(Transaction.id).where(Transaction.to_account_id.in_(accounts)).order_by(Transaction.id.desc()).limit(1)
+        ).scalar()
+        # Accounts with no history for the delete route to consume
+        spare_start = connection.execute(select(func.max(Account.id))).scalar() + 1
+        total = args.warmup + args.requests + args.memory_requests
+        connection.execute(insert(Account), [
+            {'id': spare_start + k, 'user_id': user_id, 'account_type': 'savings', 'account_number': f'spare-{k}', 'balance': 0}
+            for k in range(total)
+        ])
+    if len(accounts) < 2:
+        sys.exit("The hottest seeded user needs at least two accounts; seed more accounts")
+    # One pending posting for the queue status route to poll
+    from services import posting_queue
+    posting_id = posting_queue.enqueue(user_id, {'type': 'deposit', 'to_account_id': accounts[0], 'amount': '1.00'})
+
+    ctx = {
+        'user': dict(user), 'accounts': accounts, 'transaction_id': transaction_id, 'run_id': int(time.time()),
+        'spare_accounts': list(range(spare_start, spare_start + total)), 'posting_id': posting_id,
+    }
+    scenarios = build_scenarios(ctx)
+
+    endpoints = sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.split('.')[0] in BLUEPRINTS)
+    missing = sorted(set(endpoints) - set(scenarios))
+    if missing:
+        sys.exit(f"No benchmark scenario for: {', '.join(missing)}")
+
+    queries = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(*_):
+        queries[0] += 1
+
+    with app.app_context():
+        token = create_access_token(identity=user_id)
+
+    results = {}
+    step = 0
+    for endpoint in endpoints:
+        scenario = scenarios[endpoint]
+        client = app.test_client()
+        client.set_cookie('access_token_cookie', token)
+
+        def call():
+            nonlocal step
+            request = scenario(step)
+            step += 1
+            return client.open(request.pop('path'), **request)
+
+        for _ in range(args.warmup):
+            call()
+
+        latencies, errors = [], 0
+        queries[0] = 0
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = call()
+            response.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 500
+        query_count = queries[0]
+
+        tracemalloc.start()
+        peak = 0
+        for _ in range(args.memory_requests):
+            tracemalloc.reset_peak()
+            call().get_data()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        results[endpoint] = {
+            'requests': args.requests,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries_per_request': round(query_count / args.requests, 2),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+        r = results[endpoint]
+        print(f"{endpoint:55} p50 {r['p50_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  p99 {r['p99_ms']:8.2f}ms  "
+              f"q/req {r['queries_per_request']:6.2f}  peak {r['peak_memory_kb']:9.1f}KB  errors {errors}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'users': args.users,
+            'accounts': args.accounts,
+            'transactions': args.transactions,
+            'requests': args.requests,
+        },
+        'routes': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    # A route that answers 500 is broken, however fast it is
+    failed = [endpoint for endpoint, r in results.items() if r['errors']]
+    for endpoint in failed:
+        print(f"FAILED {endpoint}: {results[endpoint]['errors']}/{args.requests} requests returned 5xx")
+
+    regressions = compare(args.baseline, report, args.threshold) if args.baseline else []
+    for line in regressions:
+        print("REGRESSION " + line)
+    if failed or regressions:
+        sys.exit(1)
+
+
+def compare(baseline_path, report, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['routes']
+    regressions = []
+    for endpoint, current in report['routes'].items():
+        before = baseline.get(endpoint)
+        if not before:
+            continue
+        # Ignore sub-millisecond jitter on very fast routes
+        if current['p95_ms'] > before['p95_ms'] * (1 + threshold) and current['p95_ms'] - before['p95_ms'] > 1:
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['queries_per_request'] > before['queries_per_request']:
+            regressions.append(f"{endpoint}: queries/request {before['queries_per_request']} -> {current['queries_per_request']}")
+        if current['errors'] > before['errors']:
+            regressions.append(f"{endpoint}: errors {before['errors']} -> {current['errors']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    main()
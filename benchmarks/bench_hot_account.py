@@ -0,0 +1,78 @@
+# Credit throughput into one hot account as the slot count grows. Client
+# threads each post deposits (credit + commit) into the same account; with
+# slots, concurrent credits spread over that many row locks.
+#
+#   python -m benchmarks.bench_hot_account --database-url mysql+pymysql://... --slots 0,4,16 --threads 32
+#
+# Needs a database with row-level locking (MySQL, PostgreSQL): SQLite locks the
+# whole file on every write, so slots cannot help there. The account is created
+# for the run and its balance is checked against the credits at the end.
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--slots', default='0,4,16', help='Comma-separated slot counts; 0 is the plain account row')
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--credits', type=int, default=5000, help='Credits per slot count')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from sqlalchemy import select
+    from connector.db import Base, Session, engine
+    from models.account import Account
+    from models.user import User
+    import models.transaction  # noqa: F401
+    import models.account_balance_slot  # noqa: F401
+    from services.balance_service import credit
+    from services.hot_accounts import set_hot, compact, forget_hot_accounts, slot_total
+
+    Base.metadata.create_all(engine, checkfirst=True)
+    run_id = int(time.time())
+    with Session() as session:
+        user = User(username=f'hot-bench-{run_id}', email=f'hot-bench-{run_id}@bench.local', password_hash='-')
+        session.add(user)
+        session.flush()
+        account = Account(user_id=user.id, account_type='checking', account_number=f'hot-bench-{run_id}', balance=0)
+        session.add(account)
+        session.commit()
+        user_id, account_id = user.id, account.id
+
+    amount = Decimal('1.00')
+
+    def one(_):
+        with Session() as session:
+            credit(session, user_id, account_id, amount)
+            session.commit()
+
+    expected = Decimal('0')
+    for slots in [int(value) for value in args.slots.split(',')]:
+        with Session() as session:
+            set_hot(session, account_id, slots)
+            session.commit()
+        forget_hot_accounts()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(one, range(args.credits)))
+        elapsed = time.perf_counter() - started
+        expected += amount * args.credits
+        compact(Session)
+        with Session() as session:
+            total, main_row = session.execute(
+                select(Account.balance + slot_total(Account.id), Account.balance).where(Account.id == account_id)
+            ).one()
+        print(f"slots {slots:3}  {args.credits / elapsed:9.1f} credits/s  balance {total} "
+              f"({'ok' if total == expected == main_row else 'MISMATCH'})")
+
+
+if __name__ == "__main__":
+    main()
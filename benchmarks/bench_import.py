@@ -0,0 +1,141 @@
+# Measures worker boot time: how long a fresh interpreter takes to import app.py,
+# and how long its first /apispec_1.json request takes with and without the
+# spec cache. Every sample runs in its own subprocess so nothing is warm.
+#
+#   python -m benchmarks.bench_import --runs 20
+#   python -m benchmarks.bench_import --baseline benchmarks/results/import-before.json --threshold 0.2
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from benchmarks.bench_endpoints import percentile, git_revision, RESULTS_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: prints import time, first spec request time and peak RSS
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter() - started
+spec_ms = None
+if app.swagger is not None:
+    started = time.perf_counter()
+    response = app.app.test_client().get('/apispec_1.json')
+    assert response.status_code == 200, response.status_code
+    spec_ms = (time.perf_counter() - started) * 1000
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'import_ms': imported * 1000, 'spec_ms': spec_ms, 'rss_kb': rss // 1024 if sys.platform == 'darwin' else rss}))
+"""
+
+# name -> (APIDOCS_ENABLED, keep the spec cache between runs)
+MODES = {
+    'apidocs_disabled': ('false', True),
+    'apidocs_cold_spec': ('true', False),
+    'apidocs_cached_spec': ('true', True),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per mode')
+    parser.add_argument('--database-url', default='sqlite://', help='DATABASE_URL for the child processes')
+    parser.add_argument('--output', help='Where to write the results JSON (default benchmarks/results/import-<timestamp>.json)')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative p95 slowdown before failing')
+    return parser.parse_args(argv)
+
+
+def run_child(env):
+    output = subprocess.check_output([sys.executable, '-c', CHILD], cwd=ROOT, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples if sample[key] is not None]
+    if not values:
+        return None
+    return {
+        'p50_ms': round(percentile(values, 0.50), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'mean_ms': round(statistics.fmean(values), 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    for mode, (enabled, keep_cache) in MODES.items():
+        cache_dir = tempfile.mkdtemp(prefix='apispec-')
+        env = dict(os.environ, DATABASE_URL=args.database_url, APIDOCS_ENABLED=enabled, APISPEC_CACHE_DIR=cache_dir)
+        try:
+            if keep_cache and enabled == 'true':
+                # Untimed run that writes the cache file the timed runs read
+                run_child(env)
+            samples = []
+            for _ in range(args.runs):
+                if not keep_cache:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                samples.append(run_child(env))
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        results[mode] = {
+            'import': summarize(samples, 'import_ms'),
+            'first_spec_request': summarize(samples, 'spec_ms'),
+            'peak_rss_kb': max(sample['rss_kb'] for sample in samples),
+        }
+        r = results[mode]
+        spec = r['first_spec_request']
+        print(f"{mode:22} import p50 {r['import']['p50_ms']:8.1f}ms  p95 {r['import']['p95_ms']:8.1f}ms  "
+              f"spec p50 {spec['p50_ms'] if spec else '-':>8}ms  rss {r['peak_rss_kb']}KB")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'runs': args.runs,
+        },
+        'modes': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"import-{report['meta']['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        regressions = compare(args.baseline, report, args.threshold)
+        for line in regressions:
+            print("REGRESSION " + line)
+        if regressions:
+            sys.exit(1)
+
+
+def compare(baseline_path, report, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['modes']
+    regressions = []
+    for mode, current in report['modes'].items():
+        before = baseline.get(mode)
+        if not before:
+            continue
+        for key in ('import', 'first_spec_request'):
+            if not current[key] or not before.get(key):
+                continue
+            # Ignore jitter of a few milliseconds on fast steps
+            if (current[key]['p95_ms'] > before[key]['p95_ms'] * (1 + threshold)
+                    and current[key]['p95_ms'] - before[key]['p95_ms'] > 5):
+                regressions.append(f"{mode} {key}: p95 {before[key]['p95_ms']}ms -> {current[key]['p95_ms']}ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Sustained posting throughput, direct against write-behind. Client threads
+# post transfers between a few shared accounts: direct mode commits each one
+# (post_transaction + commit, as create_transaction does); queue mode appends
+# each to the posting log while one applier thread drains it in batches. The
+# clock stops when every posting is in the database.
+#
+#   python -m benchmarks.bench_posting_queue --database-url mysql+pymysql://... --threads 32 --postings 20000
+#
+# Use a database with row-level locking (MySQL, PostgreSQL) for numbers that
+# mean anything. The balances are checked against the postings at the end.
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--postings', type=int, default=20000, help='Transfers per mode')
+    parser.add_argument('--accounts', type=int, default=4, help='Accounts the transfers move between')
+    parser.add_argument('--batch', type=int, default=500, help='Applier batch size')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from sqlalchemy import select, func
+    from connector.db import Base, Session, engine
+    from models.account import Account
+    from models.user import User
+    import models.transaction  # noqa: F401
+    import models.account_balance_slot  # noqa: F401
+    import models.journal_line  # noqa: F401
+    import models.balance_checkpoint  # noqa: F401
+    from services.balance_service import post_transaction
+    from services import posting_queue
+
+    Base.metadata.create_all(engine, checkfirst=True)
+    run_id = int(time.time())
+    opening = Decimal(args.postings)
+    with Session() as session:
+        user = User(username=f'queue-bench-{run_id}', email=f'queue-bench-{run_id}@bench.local', password_hash='-')
+        session.add(user)
+        session.flush()
+        accounts = [Account(user_id=user.id, account_type='checking', account_number=f'queue-bench-{run_id}-{i}',
+                            balance=opening) for i in range(args.accounts)]
+        session.add_all(accounts)
+        session.commit()
+        user_id, account_ids = str(user.id), [account.id for account in accounts]
+
+    amount = Decimal('1.00')
+
+    def transfer(n):
+        return account_ids[n % len(account_ids)], account_ids[(n + 1) % len(account_ids)]
+
+    def direct(n):
+        from_id, to_id = transfer(n)
+        with Session() as session:
+            post_transaction(session, user_id, 'transfer', amount, from_account_id=from_id, to_account_id=to_id)
+            session.commit()
+
+    queue_path = os.path.join(tempfile.mkdtemp(), 'posting_queue.sqlite3')
+
+    def enqueue(n):
+        from_id, to_id = transfer(n)
+        posting_queue.enqueue(user_id, {'type': 'transfer', 'amount': str(amount),
+                                        'from_account_id': from_id, 'to_account_id': to_id}, queue_path)
+
+    def applier(stop):
+        while True:
+            batch = posting_queue.pending(args.batch, queue_path)
+            if not batch:
+                if stop.is_set():
+                    return
+                time.sleep(0.01)
+                continue
+            with Session() as session:
+                posting_queue.finish(posting_queue.apply_batch(session, batch), queue_path)
+
+    def queued(client):
+        stop = threading.Event()
+        worker = threading.Thread(target=applier, args=(stop,))
+        worker.start()
+        try:
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                list(pool.map(client, range(args.postings)))
+        finally:
+            stop.set()
+            worker.join()
+
+    def run_direct(client):
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(client, range(args.postings)))
+
+    for mode, run, client in (('direct', run_direct, direct), ('queue', queued, enqueue)):
+        started = time.perf_counter()
+        run(client)
+        elapsed = time.perf_counter() - started
+        with Session() as session:
+            total = session.execute(select(func.sum(Account.balance)).where(Account.id.in_(account_ids))).scalar()
+        print(f"{mode:6}  {args.postings / elapsed:9.1f} postings/s  balance total {total} "
+              f"({'ok' if total == opening * len(account_ids) else 'MISMATCH'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# Seeds a database with users, accounts and transactions for the benchmarks.
+# Transactions are skewed toward a small set of hot accounts, the way merchant
+# and settlement accounts dominate real traffic. The rows come from the bulk
+# loader (scripts/load_data.py); every account opens with enough money for the
+# write scenarios.
+from decimal import Decimal
+from scripts.load_data import generate
+
+BENCH_PASSWORD = 'benchpass'
+OPENING_BALANCE = Decimal('1000000.00')
+
+
+def seed(engine, users, accounts, transactions, days=365, seed_value=42):
+    return generate(engine, users, accounts, transactions, days=days, password=BENCH_PASSWORD,
+                    opening_balance=OPENING_BALANCE, email_domain='bench.local', seed_value=seed_value)
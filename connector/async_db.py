@@ -0,0 +1,82 @@
+import os
+from contextvars import ContextVar
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session as OrmSession
+from connector.db import RoutingSession, POOL_CONFIG, database_url
+
+# Async serving mode (asgi.py): the same models and services, run on an
+# sqlalchemy.ext.asyncio engine so a request waiting on the database does not
+# hold a thread. Needs an async driver: aiosqlite locally, aiomysql in prod.
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'mysql': 'mysql+aiomysql',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+# Set while a request is being served on the event loop; blocking waits (the
+# password hash pool) check it and await instead
+_on_event_loop = ContextVar('on_event_loop', default=False)
+
+
+def async_database_url():
+    # ASYNC_DATABASE_URL wins; otherwise the sync URL with its async driver
+    explicit = os.getenv('ASYNC_DATABASE_URL')
+    if explicit:
+        return make_url(explicit)
+    url = make_url(database_url())
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver known for {backend!r}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncBridgeSession(RoutingSession):
+    # The sync Session inside each AsyncSession. It keeps RoutingSession's
+    # events (write tracking, cache invalidation, lazy-load guard) but always
+    # uses the async engine it was given; async mode reads from the primary.
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return OrmSession.get_bind(self, mapper, clause=clause, **kw)
+
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    # Built on first use so the sync app never imports the async drivers
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        url = async_database_url()
+        options = {"pool_pre_ping": POOL_CONFIG["pool_pre_ping"]}
+        # aiosqlite runs without a queue pool and rejects the sizing options
+        if url.get_backend_name() != 'sqlite':
+            options.update(POOL_CONFIG)
+        _async_engine = create_async_engine(url, **options)
+        _async_session_factory = async_sessionmaker(_async_engine, sync_session_class=AsyncBridgeSession,
+                                                    expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSession(**kw):
+    get_async_engine()
+    return _async_session_factory(**kw)
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = _async_session_factory = None
+
+
+def on_event_loop():
+    return _on_event_loop.get()
+
+
+def mark_event_loop(value=True):
+    return _on_event_loop.set(value)
+
+
+def reset_event_loop(token):
+    _on_event_loop.reset(token)
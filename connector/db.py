@@ -1,7 +1,15 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.exc import SQLAlchemyError
+from flask import g, request, current_app, has_app_context, has_request_context, session as flask_session
+from sqlalchemy import text
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker, declarative_base, Session as OrmSession
+from sqlalchemy.pool import QueuePool
+import logging
 import os
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -19,12 +27,312 @@ DB_CONFIG = {
     "name": os.getenv('DB_NAME', 'bank-flask'),
 }
 
+# Connection pool configuration
+POOL_CONFIG = {
+    "pool_size": int(os.getenv('DB_POOL_SIZE', 5)),
+    "max_overflow": int(os.getenv('DB_MAX_OVERFLOW', 10)),
+    "pool_timeout": float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    # Recycle below MySQL's idle wait_timeout so we never hand out a dead socket
+    "pool_recycle": int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    "pool_pre_ping": os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+}
+
+
+# Read replicas: GET requests read from these unless the client wrote recently
+REPLICA_CONFIG = {
+    "urls": [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()],
+    # Read-your-writes: after a write, the same client reads from the primary this long
+    "sticky_seconds": float(os.getenv('REPLICA_STICKY_SECONDS', 5)),
+    "health_interval": float(os.getenv('REPLICA_HEALTH_INTERVAL', 10)),
+    "unhealthy_cooldown": float(os.getenv('REPLICA_UNHEALTHY_COOLDOWN', 30)),
+}
+
+
+def database_url():
+    # DATABASE_URL wins; otherwise build the MySQL URL from the DB_* settings
+    return os.getenv('DATABASE_URL') or (
+        f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+        f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['name']}"
+    )
+
+
+_pool_stats_lock = threading.Lock()
+_pool_stats = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+
+class InstrumentedQueuePool(QueuePool):
+    # QueuePool that records how long callers wait for a connection and how
+    # often they give up after pool_timeout
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with _pool_stats_lock:
+                _pool_stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with _pool_stats_lock:
+                _pool_stats["checkouts"] += 1
+                _pool_stats["wait_seconds_total"] += waited
+                _pool_stats["wait_seconds_max"] = max(_pool_stats["wait_seconds_max"], waited)
+
+
+def build_engine(url=None, **overrides):
+    # The one place engines are created, so every pool gets the same settings
+    url = make_url(url or database_url())
+    options = {"pool_pre_ping": POOL_CONFIG["pool_pre_ping"]}
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        options.update(POOL_CONFIG, poolclass=InstrumentedQueuePool)
+    options.update(overrides)
+    return create_engine(url, **options)
+
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    # A replica engine plus a cached health verdict, so a dead replica costs at
+    # most one failed probe per interval instead of one failure per request
+    def __init__(self, url):
+        self.engine = build_engine(url)
+        self.healthy = True
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def is_healthy(self):
+        now = time.monotonic()
+        interval = REPLICA_CONFIG["health_interval"] if self.healthy else REPLICA_CONFIG["unhealthy_cooldown"]
+        if now - self.checked_at < interval:
+            return self.healthy
+        with self.lock:
+            if now - self.checked_at >= interval:
+                try:
+                    with self.engine.connect() as connection:
+                        connection.execute(text("SELECT 1"))
+                    if not self.healthy:
+                        logger.info("Replica %s is healthy again", self.engine.url)
+                    self.healthy = True
+                except SQLAlchemyError as e:
+                    if self.healthy:
+                        logger.warning("Replica %s is unhealthy, reading from primary: %s", self.engine.url, e)
+                    self.healthy = False
+                self.checked_at = time.monotonic()
+        return self.healthy
+
+
 # Create engine
-engine = create_engine(
-    f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-    f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['name']}"
-)
-Session = sessionmaker(bind=engine)
+engine = build_engine()
+replicas = [Replica(url) for url in REPLICA_CONFIG["urls"]]
+_replica_cursor = 0
+
+
+def pick_replica():
+    # Round-robin over healthy replicas; None means use the primary
+    global _replica_cursor
+    for _ in range(len(replicas)):
+        _replica_cursor = (_replica_cursor + 1) % len(replicas)
+        replica = replicas[_replica_cursor]
+        if replica.is_healthy():
+            return replica.engine
+    return None
+
+
+class RoutingSession(OrmSession):
+    # Sessions opened with info={'read_only': True} read from a replica. Flushes,
+    # INSERT/UPDATE/DELETE statements and sessions without the flag always go to
+    # the primary.
+    def get_bind(self, mapper=None, clause=None, **kw):
+        writing = self._flushing or getattr(clause, 'is_dml', False)
+        if self.info.get('read_only') and not writing:
+            if 'replica' not in self.info:
+                self.info['replica'] = pick_replica()
+            if self.info['replica'] is not None:
+                return self.info['replica']
+        return engine
+
+
+Session = sessionmaker(bind=engine, class_=RoutingSession)
+
+STICKY_KEY = '_db_primary_until'
+
+
+def _reads_from_replica():
+    if not replicas or not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return False
+    return flask_session.get(STICKY_KEY, 0) <= time.time()
+
+
+def get_session():
+    # The session for the current request, opened on first use. The app closes
+    # it in teardown, so handlers never call close() themselves.
+    if 'db_session' not in g:
+        g.db_session = Session(info={'read_only': _reads_from_replica()})
+    return g.db_session
+
+
+class LazyLoadError(RuntimeError):
+    pass
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def init_app(app):
+    app.config.setdefault('DB_SESSION_DEBUG', os.getenv('DB_SESSION_DEBUG', 'false').lower() in ('1', 'true', 'yes'))
+    # Test-mode guards: raise when a request lazy-loads a relationship or runs
+    # more than DB_QUERY_BUDGET statements (0 = no budget). Views are expected to
+    # load what their templates need up front, so query counts stay constant in
+    # list size.
+    strict_default = os.getenv('DB_STRICT_LOADING', str(app.testing))
+    app.config.setdefault('DB_STRICT_LOADING', strict_default.lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('DB_QUERY_BUDGET', int(os.getenv('DB_QUERY_BUDGET', 0)))
+    if app.config['DB_SESSION_DEBUG']:
+        event.listen(Session, 'after_begin', _track_session)
+        app.teardown_request(_report_leaked_sessions)
+    if replicas:
+        app.after_request(_stick_to_primary_after_write)
+    app.teardown_appcontext(_teardown_session)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _forbid_lazy_load(orm_execute_state):
+    # lazy_loaded_from only exists on SELECTs; ORM INSERT/UPDATE raise on it
+    if not orm_execute_state.is_select:
+        return
+    if orm_execute_state.lazy_loaded_from is None or not has_request_context():
+        return
+    if current_app.config.get('DB_STRICT_LOADING'):
+        state = orm_execute_state.lazy_loaded_from
+        raise LazyLoadError(f"Lazy load from {state.class_.__name__} during {request.method} {request.path}; "
+                            f"load the relationship explicitly in the view's query")
+
+
+def _count_request_query(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    budget = current_app.config.get('DB_QUERY_BUDGET')
+    if not budget:
+        return
+    g.db_query_count = g.get('db_query_count', 0) + 1
+    if g.db_query_count > budget:
+        raise QueryBudgetExceeded(f"{request.method} {request.path} ran more than {budget} queries")
+
+
+for _bound in [engine] + [replica.engine for replica in replicas]:
+    event.listen(_bound, 'before_cursor_execute', _count_request_query)
+
+
+def _stick_to_primary_after_write(response):
+    # Read-your-writes: a client that just wrote reads from the primary until
+    # the replicas have had time to catch up
+    db_session = g.get('db_session')
+    if db_session is not None and db_session.info.get('wrote'):
+        flask_session[STICKY_KEY] = time.time() + REPLICA_CONFIG["sticky_seconds"]
+    return response
+
+
+def _teardown_session(exc):
+    session = g.pop('db_session', None)
+    if session is None:
+        return
+    try:
+        if exc is None:
+            session.commit()
+        else:
+            session.rollback()
+    except SQLAlchemyError:
+        logger.exception("Failed to finish the request session")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def _track_session(session, transaction, connection):
+    if has_app_context():
+        g.setdefault('db_sessions_begun', weakref.WeakSet()).add(session)
+
+
+def _report_leaked_sessions(exc):
+    # Debug mode: any session other than the request's own that began a
+    # transaction during this request and still holds its connection has leaked
+    request_session = g.get('db_session')
+    for session in list(g.pop('db_sessions_begun', ())):
+        if session is not request_session and session.in_transaction():
+            logger.warning("Session %r still holds a connection at the end of %s %s",
+                           session, request.method, request.path)
+
+
+def pool_stats():
+    pool = engine.pool
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": POOL_CONFIG["max_overflow"],
+        })
+    if replicas:
+        # By position in DATABASE_REPLICA_URLS: the URLs name hosts and users
+        stats["replicas"] = [{
+            "replica": index,
+            "healthy": replica.healthy,
+            "checked_out": replica.engine.pool.checkedout() if isinstance(replica.engine.pool, QueuePool) else None,
+        } for index, replica in enumerate(replicas)]
+    return stats
+
+
+def dispose_after_fork():
+    # A preloaded gunicorn master forks workers that would otherwise share the
+    # master's sockets. close=False drops the references without closing the
+    # parent's connections underneath it. Safe to call more than once.
+    engine.dispose(close=False)
+    for replica in replicas:
+        replica.engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=dispose_after_fork)
+
+
+def warm_pool(count=None):
+    # Opens up to `count` connections (default pool_size) and returns them to
+    # the pool, so a fresh worker's first requests do not pay for connecting
+    count = POOL_CONFIG["pool_size"] if count is None else count
+    if not isinstance(engine.pool, QueuePool) or count <= 0:
+        return 0
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    except SQLAlchemyError as e:
+        logger.warning("Warmed %d of %d connections: %s", len(connections), count, e)
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
 
 # Test connection
 def test_connection():
@@ -1,8 +1,15 @@
-from flask import Blueprint, request, jsonify, flash, redirect, url_for, render_template
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from flask import Blueprint, request, jsonify, flash, redirect, url_for, render_template, make_response
 from models.account import Account
-from connector.db import Session
+from connector.db import get_session
+from services.account_cache import get_account_summaries, get_account_summary, accounts_changed
+from services.listing_version import listing_version, listing_etag
+from services.balance_service import set_balance
+from services.journal import balance_at, record_adjustment
+from utils.conditional import not_modified, set_validators
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flasgger import swag_from
+from utils.apidoc import swag_from
 
 account_controller = Blueprint('account_controller', __name__)
 
@@ -11,7 +18,7 @@ account_controller = Blueprint('account_controller', __name__)
 @jwt_required()
 @swag_from({
     'summary': 'List all accounts',
-    'description': 'Retrieve all accounts associated with the authenticated user.',
+    'description': 'Retrieve all accounts associated with the authenticated user. Supports If-None-Match.',
     'responses': {
         200: {
             'description': 'List of accounts',
@@ -22,14 +29,24 @@ account_controller = Blueprint('account_controller', __name__)
                     ]
                 }
             }
+        },
+        304: {
+            'description': 'Accounts unchanged since the ETag or date the client sent'
         }
     }
 })
 def get_accounts():
     user_id = get_jwt_identity()
-    with Session() as session:
-        accounts = session.query(Account).filter_by(user_id=user_id).all()
-    return render_template('/dashboard/accounts.html', accounts=accounts)
+    session = get_session()
+    version = listing_version(session, user_id)
+    etag = listing_etag(user_id, version, request.full_path)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    accounts = get_account_summaries(session, user_id, version)
+    response = make_response(render_template('/dashboard/accounts.html', accounts=accounts))
+    return set_validators(response, etag)
 
 
 # GET /accounts/<id>: Retrieve a specific account by ID
@@ -65,9 +82,7 @@ def get_accounts():
 })
 def get_account(account_id):
     user_id = get_jwt_identity()
-    session = Session()
-    account = session.query(Account).filter_by(id=account_id, user_id=user_id).first()
-    session.close()
+    account = get_account_summary(get_session(), user_id, account_id)
     if account:
         return jsonify({
             'account_type': account.account_type,
@@ -105,10 +120,8 @@ def get_account(account_id):
 })
 def edit_account(account_id):
     user_id = get_jwt_identity()
-    session = Session()
-    account = session.query(Account).filter_by(id=account_id, user_id=user_id).first()
-    session.close()
-    
+    account = get_account_summary(get_session(), user_id, account_id)
+
     if account:
         return render_template('/dashboard/edit_account.html', account=account)
     else:
@@ -160,15 +173,88 @@ def create_account():
     account_number = request.form.get('account_number')
     balance = request.form.get('balance')
 
-    session = Session()
+    session = get_session()
     new_account = Account(user_id=user_id, account_type=account_type, account_number=account_number, balance=balance)
     session.add(new_account)
+    session.flush()
+    # The opening balance is the account's first journal entry
+    record_adjustment(session, new_account.id, Decimal(str(new_account.balance or 0)))
+    accounts_changed(session, user_id)
     session.commit()
-    session.close()
     flash("Account created successfully!", "success")
     return redirect(url_for('account_controller.get_accounts'))
 
 
+# GET /accounts/<id>/balance: Balance of an account now or at a past time
+@account_controller.route('/accounts/<int:account_id>/balance', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'summary': 'Get account balance',
+    'description': 'Balance of an account from the journal, optionally as of a past time.',
+    'parameters': [
+        {
+            'name': 'account_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'ID of the account'
+        },
+        {
+            'name': 'at',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'ISO 8601 time (UTC) to report the balance at; defaults to now'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Account balance',
+            'examples': {
+                'application/json': {'account_id': 1, 'at': '2024-01-31T23:59:59', 'balance': '1000.00'}
+            }
+        },
+        400: {
+            'description': 'Invalid time'
+        },
+        409: {
+            'description': 'The time is before the journal covers the account (its balance predates the journal)'
+        },
+        404: {
+            'description': 'Account not found'
+        }
+    }
+})
+def get_account_balance(account_id):
+    user_id = get_jwt_identity()
+    session = get_session()
+    account = get_account_summary(session, user_id, account_id)
+    if account is None:
+        return jsonify({'error': "Account not found or you are not authorized"}), 404
+    if not request.args.get('at'):
+        # The live balance, whichever LEDGER_MODE maintains it
+        return jsonify({
+            'account_id': account_id,
+            'at': datetime.utcnow().isoformat(),
+            'balance': str(account.balance)
+        }), 200
+    try:
+        at = datetime.fromisoformat(request.args['at'])
+    except ValueError:
+        return jsonify({'error': "Invalid time, use ISO 8601"}), 400
+    if at.tzinfo:
+        # Stored times are naive UTC
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    balance = balance_at(session, account_id, at)
+    if balance is None:
+        return jsonify({'error': "No journal history for this account at that time"}), 409
+    return jsonify({
+        'account_id': account_id,
+        'at': at.isoformat(),
+        'balance': str(balance)
+    }), 200
+
+
 # PUT /accounts/<id>: Update an account
 @account_controller.route('/accounts/<int:account_id>', methods=['POST'])
 @jwt_required()
@@ -203,6 +289,13 @@ def create_account():
             'type': 'number',
             'required': False,
             'description': 'New account balance'
+        },
+        {
+            'name': 'balance_original',
+            'in': 'formData',
+            'type': 'number',
+            'required': False,
+            'description': 'Balance the form was rendered with; when balance equals it, the balance is left alone'
         }
     ],
     'responses': {
@@ -217,18 +310,30 @@ def create_account():
 def update_account(account_id):
     if request.form.get('_method') == 'PUT':
         user_id = get_jwt_identity()
-        session = Session()
+        session = get_session()
         account = session.query(Account).filter_by(id=account_id, user_id=user_id).first()
 
         if account:
+            try:
+                new_balance = Decimal(request.form['balance']) if 'balance' in request.form else None
+                # The edit form always submits the balance it was rendered with;
+                # unchanged, it must not overwrite postings made since
+                if new_balance is not None and request.form.get('balance_original') \
+                        and Decimal(request.form['balance_original']) == new_balance:
+                    new_balance = None
+            except InvalidOperation:
+                flash("Invalid balance", "danger")
+                return redirect(url_for('account_controller.get_accounts'))
             account.account_type = request.form.get('account_type', account.account_type)
             account.account_number = request.form.get('account_number', account.account_number)
-            account.balance = request.form.get('balance', account.balance)
+            if new_balance is not None:
+                # Journaled as an adjustment for the difference
+                set_balance(session, account_id, new_balance)
+            accounts_changed(session, user_id)
             session.commit()
             flash("Account updated successfully!", "success")
         else:
             flash("Account not found or you are not authorized", "danger")
-        session.close()
     return redirect(url_for('account_controller.get_accounts'))
 
 
@@ -258,17 +363,17 @@ def update_account(account_id):
 })
 def delete_account(account_id):
     user_id = get_jwt_identity()
-    session = Session()
 
     # Check if the method is actually DELETE
     if request.method == 'POST':
+        session = get_session()
         account = session.query(Account).filter_by(id=account_id, user_id=user_id).first()
         if account:
             session.delete(account)
+            accounts_changed(session, user_id)
             session.commit()
             flash("Account deleted successfully", "success")
         else:
             flash("Account not found or you are not authorized", "danger")
-        session.close()
 
     return redirect(url_for('account_controller.get_accounts'))
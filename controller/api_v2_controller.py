@@ -0,0 +1,219 @@
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from sqlalchemy import select
+from models.user import User
+from connector.db import get_session
+from services.account_cache import get_account_summaries, get_account_summary
+from services.listing_version import listing_version
+from services.transaction_service import paginate_transactions, get_user_transaction
+from utils.apidoc import swag_from
+from utils.fast_json import json_response, error_response
+from utils.pagination import parse_page_size, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# JSON API for machine clients: no templates, no flash messages, Decimals as
+# exact strings. Accepts the access token as a Bearer header or the login cookie.
+api_v2_controller = Blueprint('api_v2_controller', __name__)
+
+USER_FIELDS = ('id', 'username', 'email', 'created_at')
+ACCOUNT_FIELDS = ('id', 'account_type', 'account_number', 'balance', 'updated_at')
+TRANSACTION_FIELDS = ('id', 'created_at', 'type', 'from_account_id', 'to_account_id', 'amount', 'description')
+
+FIELDS_PARAMETER = {'name': 'fields', 'in': 'query', 'type': 'string', 'required': False,
+                    'description': 'Comma-separated fields to return (default all)'}
+PAGE_PARAMETERS = [
+    {'name': 'cursor', 'in': 'query', 'type': 'string', 'required': False,
+     'description': 'Opaque cursor returned as next_cursor/prev_cursor by a previous page'},
+    {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+     'description': f'Page size (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})'}
+]
+ERROR_EXAMPLE = {'application/json': {'error': {'code': 'not_found', 'message': 'Account not found'}}}
+
+
+class ApiError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def requested_fields(allowed):
+    fields = request.args.get('fields')
+    if not fields:
+        return allowed
+    selected = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = [field for field in selected if field not in allowed]
+    if unknown or not selected:
+        raise ApiError(400, 'invalid_fields', f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    return selected
+
+
+def project(row, fields):
+    return {field: getattr(row, field) for field in fields}
+
+
+@api_v2_controller.errorhandler(ApiError)
+def api_error(e):
+    return error_response(e.status, e.code, e.message)
+
+
+@api_v2_controller.errorhandler(JWTExtendedException)
+@api_v2_controller.errorhandler(PyJWTError)
+def auth_error(e):
+    return error_response(401, 'unauthorized', str(e) or 'Missing or invalid access token')
+
+
+# GET /api/v2/users/me: The authenticated user's profile
+@api_v2_controller.route('/users/me', methods=['GET'])
+@jwt_required(locations=['headers', 'cookies'])
+@swag_from({
+    'summary': 'Get the current user (v2)',
+    'parameters': [FIELDS_PARAMETER],
+    'responses': {
+        200: {
+            'description': 'User profile',
+            'examples': {'application/json': {'id': 1, 'username': 'john_doe', 'email': 'john@example.com',
+                                              'created_at': '2024-01-01T10:00:00'}}
+        },
+        404: {'description': 'User not found', 'examples': ERROR_EXAMPLE}
+    }
+})
+def get_me():
+    fields = requested_fields(USER_FIELDS)
+    row = get_session().execute(
+        select(User.id, User.username, User.email, User.created_at).where(User.id == get_jwt_identity())
+    ).first()
+    if row is None:
+        raise ApiError(404, 'not_found', 'User not found')
+    return json_response(project(row, fields))
+
+
+# GET /api/v2/accounts: The user's accounts, ordered by id
+@api_v2_controller.route('/accounts', methods=['GET'])
+@jwt_required(locations=['headers', 'cookies'])
+@swag_from({
+    'summary': 'List accounts (v2)',
+    'parameters': [FIELDS_PARAMETER] + PAGE_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'One page of accounts',
+            'examples': {'application/json': {
+                'accounts': [{'id': 1, 'account_type': 'savings', 'account_number': '12345', 'balance': '1000.00',
+                              'updated_at': '2024-01-01T10:00:00'}],
+                'next_cursor': None, 'limit': 20
+            }}
+        },
+        400: {'description': 'Invalid fields or cursor', 'examples': ERROR_EXAMPLE}
+    }
+})
+def list_accounts():
+    fields = requested_fields(ACCOUNT_FIELDS)
+    limit = parse_page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
+    # The account list is small and cached per user, so the cursor is simply
+    # the last id of the previous page
+    try:
+        after_id = int(cursor) if cursor else 0
+    except ValueError:
+        raise ApiError(400, 'invalid_cursor', f"Invalid cursor: {cursor!r}")
+
+    session, user_id = get_session(), get_jwt_identity()
+    # Checked against the listing version, so another worker's postings are
+    # not served from a stale cached list
+    accounts = [account for account in get_account_summaries(session, user_id, listing_version(session, user_id))
+                if account.id > after_id]
+    page = accounts[:limit]
+    return json_response({
+        'accounts': [project(account, fields) for account in page],
+        'next_cursor': str(page[-1].id) if len(accounts) > limit else None,
+        'limit': limit
+    })
+
+
+# GET /api/v2/accounts/<id>: One account
+@api_v2_controller.route('/accounts/<int:account_id>', methods=['GET'])
+@jwt_required(locations=['headers', 'cookies'])
+@swag_from({
+    'summary': 'Get an account (v2)',
+    'parameters': [
+        {'name': 'account_id', 'in': 'path', 'type': 'integer', 'required': True},
+        FIELDS_PARAMETER
+    ],
+    'responses': {
+        200: {'description': 'Account details'},
+        404: {'description': 'Account not found or not owned by the user', 'examples': ERROR_EXAMPLE}
+    }
+})
+def get_account(account_id):
+    fields = requested_fields(ACCOUNT_FIELDS)
+    account = get_account_summary(get_session(), get_jwt_identity(), account_id)
+    if account is None:
+        raise ApiError(404, 'not_found', 'Account not found')
+    return json_response(project(account, fields))
+
+
+# GET /api/v2/transactions: Keyset-paginated history, newest first
+@api_v2_controller.route('/transactions', methods=['GET'])
+@jwt_required(locations=['headers', 'cookies'])
+@swag_from({
+    'summary': 'List transactions (v2)',
+    'parameters': [
+        FIELDS_PARAMETER,
+        {'name': 'account_id', 'in': 'query', 'type': 'integer', 'required': False},
+        {'name': 'start_date', 'in': 'query', 'type': 'string', 'format': 'date-time', 'required': False},
+        {'name': 'end_date', 'in': 'query', 'type': 'string', 'format': 'date-time', 'required': False},
+        {'name': 'type', 'in': 'query', 'type': 'string', 'required': False}
+    ] + PAGE_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'One page of transactions',
+            'examples': {'application/json': {
+                'transactions': [{'id': 7, 'created_at': '2024-01-01T10:00:00', 'type': 'transfer', 'from_account_id': 1,
+                                  'to_account_id': 2, 'amount': '50.00', 'description': 'Rent'}],
+                'next_cursor': 'WyIyMDI0LTAxLTAxVDEwOjAwOjAwIiw3LCJuZXh0Il0', 'prev_cursor': None, 'limit': 20
+            }}
+        },
+        400: {'description': 'Invalid fields or cursor', 'examples': ERROR_EXAMPLE}
+    }
+})
+def list_transactions():
+    fields = requested_fields(TRANSACTION_FIELDS)
+    limit = parse_page_size(request.args.get('limit'))
+    try:
+        page = paginate_transactions(
+            get_session(), get_jwt_identity(), limit, request.args.get('cursor'),
+            account_id=request.args.get('account_id'), start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'), transaction_type=request.args.get('type')
+        )
+    except ValueError as e:
+        raise ApiError(400, 'invalid_cursor', str(e))
+    return json_response({
+        'transactions': [project(transaction, fields) for transaction in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'limit': page.limit
+    })
+
+
+# GET /api/v2/transactions/<id>: One transaction on one of the user's accounts
+@api_v2_controller.route('/transactions/<int:transaction_id>', methods=['GET'])
+@jwt_required(locations=['headers', 'cookies'])
+@swag_from({
+    'summary': 'Get a transaction (v2)',
+    'parameters': [
+        {'name': 'transaction_id', 'in': 'path', 'type': 'integer', 'required': True},
+        FIELDS_PARAMETER
+    ],
+    'responses': {
+        200: {'description': 'Transaction details'},
+        404: {'description': 'Transaction not found or not on the user\'s accounts', 'examples': ERROR_EXAMPLE}
+    }
+})
+def get_transaction(transaction_id):
+    fields = requested_fields(TRANSACTION_FIELDS)
+    transaction = get_user_transaction(get_session(), get_jwt_identity(), transaction_id)
+    if transaction is None:
+        raise ApiError(404, 'not_found', 'Transaction not found')
+    return json_response(project(transaction, fields))
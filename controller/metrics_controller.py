@@ -0,0 +1,32 @@
+from flask import Blueprint, Response
+from utils.apidoc import swag_from
+from services import metrics, password_hasher, account_cache
+from connector.db import pool_stats
+from utils.ops_auth import require_ops_token
+
+metrics_controller = Blueprint('metrics_controller', __name__)
+metrics_controller.before_request(require_ops_token)
+
+# GET /metrics: Prometheus scrape endpoint
+@metrics_controller.route('/metrics', methods=['GET'])
+@swag_from({
+    'summary': 'Prometheus metrics',
+    'description': 'Route latency, SQL count and time per request, template render time, password hash time '
+                   'and pool counters for this process, in Prometheus text format.',
+    'produces': ['text/plain'],
+    'responses': {
+        200: {
+            'description': 'Metrics in Prometheus text exposition format',
+            'examples': {
+                'text/plain': 'http_request_duration_seconds_bucket{method="GET",route="/accounts/accounts",le="0.005"} 42'
+            }
+        }
+    }
+})
+def get_metrics():
+    body = metrics.render([
+        ('db_pool', {key: value for key, value in pool_stats().items() if key != 'replicas'}),
+        ('hash_pool', password_hasher.stats()),
+        ('account_cache', account_cache.stats()),
+    ])
+    return Response(body, mimetype='text/plain; version=0.0.4')
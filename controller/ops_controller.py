@@ -0,0 +1,88 @@
+from flask import Blueprint, jsonify
+from utils.apidoc import swag_from
+from services import password_hasher
+from connector.db import pool_stats
+from services import account_cache
+from utils.ops_auth import require_ops_token
+
+ops_controller = Blueprint('ops_controller', __name__)
+ops_controller.before_request(require_ops_token)
+
+# GET /ops/hash-pool: Password hashing pool metrics
+@ops_controller.route('/hash-pool', methods=['GET'])
+@swag_from({
+    'summary': 'Password hashing pool metrics',
+    'description': 'Counters for the worker pool that runs password hashing in this process.',
+    'responses': {
+        200: {
+            'description': 'Hash pool metrics',
+            'examples': {
+                'application/json': {
+                    'pool_size': 4,
+                    'queue_depth_limit': 16,
+                    'in_flight': 0,
+                    'hashes': 120,
+                    'rejected': 0,
+                    'timeouts': 0,
+                    'queue_wait_seconds_total': 0.42,
+                    'queue_wait_seconds_max': 0.05,
+                    'hash_seconds_total': 31.7
+                }
+            }
+        }
+    }
+})
+def hash_pool_stats():
+    return jsonify(password_hasher.stats()), 200
+
+
+# GET /ops/db-pool: Database connection pool metrics
+@ops_controller.route('/db-pool', methods=['GET'])
+@swag_from({
+    'summary': 'Database connection pool metrics',
+    'description': 'Checked-out connections, overflow, checkout wait time and timeouts for the shared engine in this process.',
+    'responses': {
+        200: {
+            'description': 'Connection pool metrics',
+            'examples': {
+                'application/json': {
+                    'size': 5,
+                    'checked_in': 3,
+                    'checked_out': 2,
+                    'overflow': 0,
+                    'max_overflow': 10,
+                    'checkouts': 5120,
+                    'timeouts': 0,
+                    'wait_seconds_total': 1.84,
+                    'wait_seconds_max': 0.12,
+                    'replicas': [{'replica': 0, 'healthy': True, 'checked_out': 1}]
+                }
+            }
+        }
+    }
+})
+def db_pool_stats():
+    return jsonify(pool_stats()), 200
+
+
+# GET /ops/cache: Account cache metrics
+@ops_controller.route('/cache', methods=['GET'])
+@swag_from({
+    'summary': 'Account cache metrics',
+    'description': 'Hit, miss and invalidation counters for the per-user account cache in this process.',
+    'responses': {
+        200: {
+            'description': 'Cache metrics',
+            'examples': {
+                'application/json': {
+                    'backend': 'LRUCache',
+                    'hits': 9500,
+                    'misses': 500,
+                    'invalidations': 120
+                }
+            }
+        }
+    }
+})
+def cache_stats():
+    return jsonify(account_cache.stats()), 200
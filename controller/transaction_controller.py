@@ -1,22 +1,39 @@
-from flask import Blueprint, request, flash, redirect, url_for, render_template
-from models.transaction import Transaction
-from models.account import Account
+from flask import Blueprint, request, jsonify, flash, redirect, url_for, render_template, make_response, Response, stream_with_context
 from models.user import User
-from connector.db import Session
+from connector.db import get_session
+from services.account_cache import get_account_summaries
+from services.balance_service import post_transaction, post_batch, parse_batch_item, BalanceError, BatchRejected
+from services import posting_queue
+from services.grant_service import grant_covers, current_grant, issue_grant, revoke_grant, set_grant_cookie, unset_grant_cookie, GRANT_COOKIE
+from services.transaction_service import paginate_transactions, get_user_transaction, user_account_ids, export_statement
+from services.rollup_service import account_summary, GRANULARITIES
+from services.listing_version import listing_version, listing_etag
+from utils.conditional import not_modified, set_validators
+from utils.pagination import parse_page_size, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from decimal import Decimal
-from sqlalchemy import or_
-from flasgger import swag_from
+from decimal import Decimal, InvalidOperation
+from utils.apidoc import swag_from
+import csv
+import io
+import json
+import os
+import zlib
 
 transaction_controller = Blueprint('transaction_controller', __name__)
 
+TRANSACTION_BATCH_MAX = int(os.getenv('TRANSACTION_BATCH_MAX', 5000))
+EXPORT_FORMATS = {'csv': ('text/csv', 'csv'), 'ndjson': ('application/x-ndjson', 'ndjson')}
+EXPORT_COLUMNS = ('id', 'created_at', 'type', 'from_account_id', 'to_account_id', 'amount', 'description')
+EXPORT_CHUNK_ROWS = 1000
+
 # GET /transactions: Retrieve all transactions for the user's accounts
 @transaction_controller.route('/transactions', methods=['GET'])
 @jwt_required()
 @swag_from({
-    'summary': 'Retrieve all transactions',
-    'description': 'Retrieve all transactions for the authenticated user\'s accounts, with optional filters.',
+    'summary': 'Retrieve transactions',
+    'description': 'Retrieve a page of transactions for the authenticated user\'s accounts, with optional filters. '
+                   'Supports If-None-Match.',
     'parameters': [
         {
             'name': 'account_id',
@@ -47,46 +64,142 @@ transaction_controller = Blueprint('transaction_controller', __name__)
             'type': 'string',
             'required': False,
             'description': 'Optional filter to retrieve transactions of a specific type'
+        },
+        {
+            'name': 'cursor',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Opaque page cursor returned as next/prev by a previous page'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': f'Page size (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})'
         }
     ],
     'responses': {
         200: {
-            'description': 'List of transactions for the authenticated user'
+            'description': 'One page of transactions for the authenticated user, newest first'
+        },
+        304: {
+            'description': 'Nothing changed since the ETag or date the client sent'
         }
     }
 })
 def get_transactions():
     user_id = get_jwt_identity()
-    account_id = request.args.get('account_id')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    transaction_type = request.args.get('type')  # Get transaction type from query parameters
-
-    session = Session()
-    query = session.query(Transaction).join(
-        Account, or_(
-            Transaction.from_account_id == Account.id,
-            Transaction.to_account_id == Account.id
-        )
-    ).filter(Account.user_id == user_id)
-
-    if account_id:
-        query = query.filter(
-            or_(
-                Transaction.from_account_id == account_id,
-                Transaction.to_account_id == account_id
-            )
-        )
-    if start_date and end_date:
-        query = query.filter(Transaction.created_at.between(start_date, end_date))
-    if transaction_type:  # Filter by transaction type if provided
-        query = query.filter(Transaction.type == transaction_type)
-
-    transactions = query.all()
-    accounts = session.query(Account).filter_by(user_id=user_id).all()
-    session.close()
-
-    return render_template('/dashboard/transactions.html', transactions=transactions, accounts=accounts)
+    limit = parse_page_size(request.args.get('limit'))
+
+    session = get_session()
+    grant = current_grant(user_id)
+    version = listing_version(session, user_id)
+    # The grant expiry shown on the page is part of what the client has cached
+    etag = listing_etag(user_id, version, request.full_path, grant['exp'] if grant else None)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    accounts = get_account_summaries(session, user_id, version)
+    try:
+        page = paginate_transactions(session, user_id, limit, request.args.get('cursor'), **_list_filters())
+    except ValueError:
+        flash("Invalid page cursor", "danger")
+        return redirect(url_for('transaction_controller.get_transactions'))
+
+    page_args = {k: v for k, v in request.args.items() if k != 'cursor'}
+    next_url = url_for('transaction_controller.get_transactions', cursor=page.next_cursor, **page_args) if page.next_cursor else None
+    prev_url = url_for('transaction_controller.get_transactions', cursor=page.prev_cursor, **page_args) if page.prev_cursor else None
+
+    grant_expires_at = datetime.utcfromtimestamp(grant['exp']) if grant else None
+
+    response = make_response(render_template('/dashboard/transactions.html', transactions=page.items, accounts=accounts,
+                                             next_url=next_url, prev_url=prev_url, grant_expires_at=grant_expires_at))
+    return set_validators(response, etag)
+
+
+# GET /transactions/json: Same paginated listing as JSON
+@transaction_controller.route('/transactions/json', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'summary': 'Retrieve transactions as JSON',
+    'description': 'Keyset-paginated transactions for the authenticated user\'s accounts. Accepts the same filters as the HTML listing.',
+    'parameters': [
+        {'name': 'account_id', 'in': 'query', 'type': 'integer', 'required': False},
+        {'name': 'start_date', 'in': 'query', 'type': 'string', 'format': 'date-time', 'required': False},
+        {'name': 'end_date', 'in': 'query', 'type': 'string', 'format': 'date-time', 'required': False},
+        {'name': 'type', 'in': 'query', 'type': 'string', 'required': False},
+        {'name': 'cursor', 'in': 'query', 'type': 'string', 'required': False},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False}
+    ],
+    'responses': {
+        200: {
+            'description': 'One page of transactions',
+            'examples': {
+                'application/json': {
+                    'transactions': [
+                        {'id': 7, 'type': 'transfer', 'from_account_id': 1, 'to_account_id': 2,
+                         'amount': '50.00', 'description': 'Rent', 'created_at': '2024-01-01T10:00:00'}
+                    ],
+                    'next_cursor': 'WyIyMDI0LTAxLTAxVDEwOjAwOjAwIiw3LCJuZXh0Il0',
+                    'prev_cursor': None,
+                    'limit': 20
+                }
+            }
+        },
+        304: {
+            'description': 'Nothing changed since the ETag or date the client sent'
+        },
+        400: {
+            'description': 'Invalid cursor'
+        }
+    }
+})
+def get_transactions_json():
+    user_id = get_jwt_identity()
+    limit = parse_page_size(request.args.get('limit'))
+
+    session = get_session()
+    version = listing_version(session, user_id)
+    etag = listing_etag(user_id, version, request.full_path)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    # Reload a cached account list that no longer matches the version, since
+    # the page's account ids are resolved from it
+    get_account_summaries(session, user_id, version)
+    try:
+        page = paginate_transactions(session, user_id, limit, request.args.get('cursor'), **_list_filters())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify({
+        'transactions': [{
+            'id': t.id,
+            'type': t.type,
+            'from_account_id': t.from_account_id,
+            'to_account_id': t.to_account_id,
+            'amount': str(t.amount),
+            'description': t.description,
+            'created_at': t.created_at.isoformat()
+        } for t in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'limit': page.limit
+    })
+    return set_validators(response, etag)
+
+
+def _list_filters():
+    return {
+        'account_id': request.args.get('account_id'),
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date'),
+        'transaction_type': request.args.get('type')
+    }
 
 
 # GET /transactions/<id>: Retrieve details of a specific transaction
@@ -126,13 +239,8 @@ def get_transactions():
 })
 def get_transaction(transaction_id):
     user_id = get_jwt_identity()
-    session = Session()
-    transaction = session.query(Transaction).join(Account).filter(
-        Transaction.id == transaction_id,
-        (Transaction.from_account_id == Account.id) | (Transaction.to_account_id == Account.id),
-        Account.user_id == user_id
-    ).first()
-    session.close()
+    session = get_session()
+    transaction = get_user_transaction(session, user_id, transaction_id)
 
     if transaction:
         return render_template('/dashboard/view_transaction.html', transaction=transaction)
@@ -187,14 +295,21 @@ def get_transaction(transaction_id):
             'name': 'confirm_password',
             'in': 'formData',
             'type': 'string',
-            'required': True,
-            'description': 'Confirm password for transaction'
+            'required': False,
+            'description': 'Confirm password for transaction; not needed while a transaction grant cookie covers the amount'
         }
     ],
     'responses': {
         201: {
             'description': 'Transaction completed successfully'
         },
+        202: {
+            'description': 'With POSTING_QUEUE enabled: accepted and pending; poll /transactions/queue/<id> for the outcome',
+            'examples': {
+                'application/json': {'id': '9f1c0b6e2d8a4c51b7e3a0d4f6c2e8b1', 'status': 'pending',
+                                     'status_url': '/transactions/queue/9f1c0b6e2d8a4c51b7e3a0d4f6c2e8b1'}
+            }
+        },
         400: {
             'description': 'Invalid transaction request'
         }
@@ -205,57 +320,411 @@ def create_transaction():
     transaction_type = request.form.get('type')
     from_account_id = request.form.get('from_account_id')
     to_account_id = request.form.get('to_account_id') if transaction_type in ["transfer", "deposit"] else None
-    amount = Decimal(request.form.get('amount'))
     description = request.form.get('description', '')
     confirm_password = request.form.get('confirm_password')
+    try:
+        amount = Decimal(request.form.get('amount'))
+    except (TypeError, InvalidOperation):
+        flash("Invalid amount", "danger")
+        return redirect(url_for('transaction_controller.get_transactions'))
 
-    session = Session()
+    response = redirect(url_for('transaction_controller.get_transactions'))
+    session = get_session()
 
-    user = session.query(User).filter_by(id=user_id).first()
-    if not user or not user.check_password(confirm_password):
-        flash("Password confirmation failed.", "danger")
-        session.close()
-        return redirect(url_for('transaction_controller.get_transactions'))
+    # A live transaction grant stands in for the password; otherwise confirm it
+    # once and hand out a grant so the next postings skip the hash
+    if not grant_covers(session, user_id, amount):
+        user = session.query(User).filter_by(id=user_id).first()
+        if not user or not confirm_password or not user.check_password(confirm_password):
+            flash("Password confirmation failed.", "danger")
+            return response
+        set_grant_cookie(response, issue_grant(session, user_id))
+        session.commit()
 
-    from_account = session.query(Account).filter_by(id=from_account_id, user_id=user_id).first() if from_account_id else None
-    to_account = session.query(Account).filter_by(id=to_account_id, user_id=user_id).first() if to_account_id else None
-
-    if transaction_type == "deposit" and to_account:
-        to_account.balance += amount
-
-    elif transaction_type == "withdrawal" and from_account:
-        if from_account.balance >= amount:
-            from_account.balance -= amount
-        else:
-            flash("Insufficient funds for withdrawal", "danger")
-            session.close()
-            return redirect(url_for('transaction_controller.get_transactions'))
-
-    elif transaction_type == "transfer" and from_account and to_account:
-        if from_account.balance >= amount:
-            from_account.balance -= amount
-            to_account.balance += amount
-        else:
-            flash("Insufficient funds for transfer", "danger")
-            session.close()
-            return redirect(url_for('transaction_controller.get_transactions'))
+    if posting_queue.POSTING_QUEUE_ENABLED:
+        return _enqueue_transaction(session, user_id, response, {
+            'type': transaction_type,
+            'amount': str(amount),
+            'from_account_id': from_account_id,
+            'to_account_id': to_account_id,
+            'description': description
+        })
 
-    else:
-        flash("Invalid accounts selected or unauthorized access", "danger")
-        session.close()
-        return redirect(url_for('transaction_controller.get_transactions'))
+    try:
+        post_transaction(session, user_id, transaction_type, amount,
+                         from_account_id=from_account_id, to_account_id=to_account_id, description=description)
+        session.commit()
+        flash("Transaction completed successfully", "success")
+    except BalanceError as e:
+        session.rollback()
+        flash(str(e), "danger")
 
-    transaction = Transaction(
-        type=transaction_type,
-        from_account_id=from_account_id,
-        to_account_id=to_account_id,
-        amount=amount,
-        description=description,
-        created_at=datetime.utcnow()
-    )
-    session.add(transaction)
+    return response
+
+
+def _enqueue_transaction(session, user_id, response, item):
+    # Everything short of the funds check happens here, so the applier only
+    # rejects what depends on balances
+    wants_json = request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+    try:
+        _, _, from_account_id, to_account_id, _ = parse_batch_item(item)
+        owned = set(user_account_ids(session, user_id))
+        if any(account_id and account_id not in owned for account_id in (from_account_id, to_account_id)):
+            raise BalanceError("Invalid accounts selected or unauthorized access")
+    except BalanceError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), "danger")
+        return response
+
+    posting_id = posting_queue.enqueue(user_id, item)
+    # Keeps what this posting charged to the grant
     session.commit()
-    flash("Transaction completed successfully", "success")
+    if wants_json:
+        status_url = url_for('transaction_controller.get_queued_transaction', posting_id=posting_id)
+        accepted = jsonify({'id': posting_id, 'status': posting_queue.PENDING, 'status_url': status_url})
+        accepted.status_code = 202
+        accepted.headers['Location'] = status_url
+        # Keep any grant cookie issued for this request
+        for cookie in response.headers.getlist('Set-Cookie'):
+            accepted.headers.add('Set-Cookie', cookie)
+        return accepted
+    flash(f"Transaction accepted and pending (reference {posting_id})", "success")
+    return response
+
+
+# GET /transactions/queue/<id>: Outcome of a queued transaction
+@transaction_controller.route('/transactions/queue/<posting_id>', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'summary': 'Get a queued transaction',
+    'description': 'Status of a transaction accepted while POSTING_QUEUE is enabled: pending, applied or rejected.',
+    'parameters': [
+        {
+            'name': 'posting_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'ID returned when the transaction was accepted'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Posting status',
+            'examples': {
+                'application/json': {'id': '9f1c0b6e2d8a4c51b7e3a0d4f6c2e8b1', 'status': 'rejected',
+                                     'error': 'Insufficient funds for withdrawal',
+                                     'enqueued_at': 1718000000.1, 'finished_at': 1718000000.4}
+            }
+        },
+        404: {
+            'description': 'Unknown posting, or not yours'
+        }
+    }
+})
+def get_queued_transaction(posting_id):
+    status = posting_queue.posting_status(posting_id, get_jwt_identity())
+    if status is None:
+        return jsonify({'error': 'Posting not found'}), 404
+    response = jsonify(status)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# POST /transactions/batch: Post many transactions in one request and one commit
+@transaction_controller.route('/transactions/batch', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'summary': 'Post a batch of transactions',
+    'description': 'Apply up to TRANSACTION_BATCH_MAX deposits, withdrawals and transfers in a single DB transaction. '
+                   'Items are applied in order; with atomic=true any rejected item aborts the whole batch. '
+                   'confirm_password may be omitted while a transaction grant covers the batch total.',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'confirm_password': {'type': 'string'},
+                    'atomic': {'type': 'boolean'},
+                    'transactions': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'type': {'type': 'string', 'enum': ['deposit', 'withdrawal', 'transfer']},
+                                'from_account_id': {'type': 'integer'},
+                                'to_account_id': {'type': 'integer'},
+                                'amount': {'type': 'string'},
+                                'description': {'type': 'string'}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Per-item results',
+            'examples': {
+                'application/json': {
+                    'applied': 1,
+                    'rejected': 1,
+                    'results': [
+                        {'index': 0, 'status': 'applied'},
+                        {'index': 1, 'status': 'rejected', 'error': 'Insufficient funds for withdrawal'}
+                    ]
+                }
+            }
+        },
+        400: {
+            'description': 'Malformed batch, or atomic batch with rejected items'
+        },
+        409: {
+            'description': 'Balances changed concurrently; retry the batch'
+        },
+        401: {
+            'description': 'Password confirmation failed'
+        }
+    }
+})
+def create_transactions_batch():
+    user_id = get_jwt_identity()
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('transactions')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'transactions must be a non-empty array'}), 400
+    if len(items) > TRANSACTION_BATCH_MAX:
+        return jsonify({'error': f'At most {TRANSACTION_BATCH_MAX} transactions per batch'}), 400
+
+    # The grant has to cover the sum of valid, positive amounts; a batch with
+    # any invalid item needs the password, so negatives cannot offset the total
+    try:
+        batch_total = sum(parse_batch_item(item)[1] for item in items)
+    except BalanceError:
+        batch_total = None
+
+    session = get_session()
+    if batch_total is None or not grant_covers(session, user_id, batch_total):
+        user = session.query(User).filter_by(id=user_id).first()
+        confirm_password = payload.get('confirm_password')
+        if not user or not isinstance(confirm_password, str) or not user.check_password(confirm_password):
+            return jsonify({'error': 'Password confirmation failed.'}), 401
+
+    try:
+        results = post_batch(session, user_id, items, atomic=bool(payload.get('atomic')))
+        session.commit()
+    except BatchRejected as e:
+        session.rollback()
+        return jsonify({'error': str(e), 'results': e.results}), 400
+    except BalanceError as e:
+        session.rollback()
+        return jsonify({'error': str(e)}), 409
+
+    applied = sum(1 for result in results if result['status'] == 'applied')
+    return jsonify({'applied': applied, 'rejected': len(results) - applied, 'results': results}), 200
+
+
+# POST /transactions/grant/revoke: End the current transaction grant early
+@transaction_controller.route('/transactions/grant/revoke', methods=['POST'])
+@jwt_required()
+@swag_from({
+    'summary': 'Revoke transaction grant',
+    'description': 'Revoke the short-lived transaction grant so the next transaction asks for the password again.',
+    'responses': {
+        200: {
+            'description': 'Grant revoked, redirect to transactions'
+        }
+    }
+})
+def revoke_transaction_grant():
+    session = get_session()
+    if revoke_grant(session, request.cookies.get(GRANT_COOKIE)):
+        session.commit()
+
+    response = redirect(url_for('transaction_controller.get_transactions'))
+    unset_grant_cookie(response)
+    flash("Transaction authorization revoked", "info")
+    return response
+
+
+# GET /transactions/summary: Per-period totals served from the rollup tables
+@transaction_controller.route('/transactions/summary', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'summary': 'Transaction summary',
+    'description': 'Monthly or daily counts and totals in/out per account and type, read from the rollup tables. '
+                   'Without account_id, the totals leave out transfers, which always move money between two of '
+                   'the user\'s own accounts and would otherwise count once as outflow and once as inflow.',
+    'parameters': [
+        {
+            'name': 'account_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Optional filter to summarize a single account'
+        },
+        {
+            'name': 'granularity',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['month', 'day'],
+            'required': False,
+            'description': 'Period size (default month)'
+        },
+        {
+            'name': 'start_date',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'First period to include, e.g. 2024-01 or 2024-01-15'
+        },
+        {
+            'name': 'end_date',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Last period to include'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Summary lines and totals by type',
+            'examples': {
+                'application/json': {
+                    'granularity': 'month',
+                    'periods': [
+                        {'account_id': 1, 'period': '2024-01', 'type': 'deposit', 'count': 3, 'sum_in': '150.00', 'sum_out': '0.00'}
+                    ],
+                    'totals': {
+                        'deposit': {'count': 3, 'sum_in': '150.00', 'sum_out': '0.00'}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Unknown granularity'
+        }
+    }
+})
+def get_transaction_summary():
+    user_id = get_jwt_identity()
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': 'granularity must be month or day'}), 400
+
+    session = get_session()
+    account_ids = user_account_ids(session, user_id, request.args.get('account_id'))
+    rollups = account_summary(session, account_ids, granularity, request.args.get('start_date'),
+                           request.args.get('end_date'))
+
+    # Transfers only ever run between two of the user's own accounts: across all
+    # of them they are internal moves, not money in or out
+    internal_transfers = not request.args.get('account_id')
+    totals = {}
+    for rollup in rollups:
+        if internal_transfers and rollup.type == 'transfer':
+            continue
+        total = totals.setdefault(rollup.type, {'count': 0, 'sum_in': Decimal('0'), 'sum_out': Decimal('0')})
+        total['count'] += rollup.count
+        total['sum_in'] += rollup.sum_in
+        total['sum_out'] += rollup.sum_out
+
+    return jsonify({
+        'granularity': granularity,
+        'periods': [{
+            'account_id': rollup.account_id,
+            'period': rollup.period,
+            'type': rollup.type,
+            'count': rollup.count,
+            'sum_in': str(rollup.sum_in),
+            'sum_out': str(rollup.sum_out)
+        } for rollup in rollups],
+        'totals': {
+            txn_type: {'count': total['count'], 'sum_in': str(total['sum_in']), 'sum_out': str(total['sum_out'])}
+            for txn_type, total in totals.items()
+        }
+    }), 200
+
+
+# GET /transactions/export: Stream a statement as CSV or NDJSON
+@transaction_controller.route('/transactions/export', methods=['GET'])
+@jwt_required()
+@swag_from({
+    'summary': 'Export transactions',
+    'description': 'Stream every matching transaction, oldest first, as CSV or NDJSON. Accepts the same filters as the transaction listing.',
+    'parameters': [
+        {'name': 'format', 'in': 'query', 'type': 'string', 'enum': ['csv', 'ndjson'], 'required': False, 'description': 'Output format (default csv)'},
+        {'name': 'gzip', 'in': 'query', 'type': 'boolean', 'required': False, 'description': 'Compress the download with gzip'},
+        {'name': 'account_id', 'in': 'query', 'type': 'integer', 'required': False},
+        {'name': 'start_date', 'in': 'query', 'type': 'string', 'format': 'date-time', 'required': False},
+        {'name': 'end_date', 'in': 'query', 'type': 'string', 'format': 'date-time', 'required': False},
+        {'name': 'type', 'in': 'query', 'type': 'string', 'required': False}
+    ],
+    'responses': {
+        200: {
+            'description': 'Streamed statement'
+        },
+        400: {
+            'description': 'Unknown format'
+        }
+    }
+})
+def export_transactions():
+    user_id = get_jwt_identity()
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    session = get_session()
+    statement = export_statement(session, user_id, **_list_filters())
+    render_rows = _csv_chunk if export_format == 'csv' else _ndjson_chunk
+
+    def generate():
+        compressor = zlib.compressobj(wbits=31) if compress else None
+
+        def emit(chunk):
+            if compressor is None:
+                return chunk.encode()
+            # Sync-flush so every chunk reaches the client as soon as it is ready
+            return compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        if export_format == 'csv':
+            yield emit(_csv_chunk([EXPORT_COLUMNS]))
+        result = session.execute(statement, execution_options={'stream_results': True, 'yield_per': EXPORT_CHUNK_ROWS})
+        for rows in result.partitions():
+            yield emit(render_rows(rows))
+        if compressor is not None:
+            yield compressor.flush()
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"transactions.{extension}" + ('.gz' if compress else '')
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/gzip' if compress else mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+    return buffer.getvalue()
+
 
-    session.close()
-    return redirect(url_for('transaction_controller.get_transactions'))
+def _ndjson_chunk(rows):
+    return ''.join(json.dumps({
+        'id': row.id,
+        'created_at': row.created_at.isoformat(),
+        'type': row.type,
+        'from_account_id': row.from_account_id,
+        'to_account_id': row.to_account_id,
+        'amount': str(row.amount),
+        'description': row.description
+    }) + '\n' for row in rows)
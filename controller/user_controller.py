@@ -1,10 +1,10 @@
 from flask import Blueprint, request, jsonify, redirect, url_for, flash, render_template, make_response
 from sqlalchemy.exc import IntegrityError
 from models.user import User
-from connector.db import Session
+from connector.db import get_session
+from services.grant_service import revoke_grant, unset_grant_cookie, GRANT_COOKIE
 from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity, set_access_cookies, unset_jwt_cookies
-from werkzeug.security import generate_password_hash, check_password_hash
-from flasgger import swag_from
+from utils.apidoc import swag_from
 
 user_controller = Blueprint('user_controller', __name__)
 
@@ -54,7 +54,7 @@ def register_user():
             flash("All fields are required.", "danger")
             return redirect(url_for('user_controller.register_user'))
 
-        session = Session()
+        session = get_session()
         try:
             if session.query(User).filter((User.email == email) | (User.username == username)).first():
                 flash("Email or username already exists.", "danger")
@@ -70,8 +70,6 @@ def register_user():
         except IntegrityError:
             session.rollback()
             flash("An error occurred. Please try again.", "danger")
-        finally:
-            session.close()
 
     return render_template('register.html')
 
@@ -109,9 +107,8 @@ def login():
         email = request.form.get('email')
         password = request.form.get('password')
 
-        session = Session()
+        session = get_session()
         user = session.query(User).filter_by(email=email).first()
-        session.close()
 
         if user and user.check_password(password):
             access_token = create_access_token(identity=user.id)
@@ -147,9 +144,8 @@ def login():
 })
 def get_profile():
     user_id = get_jwt_identity()
-    session = Session()
+    session = get_session()
     user = session.query(User).filter_by(id=user_id).first()
-    session.close()
 
     if not user:
         flash("User not found", "danger")
@@ -206,7 +202,7 @@ def get_profile():
 })
 def update_profile():
     user_id = get_jwt_identity()
-    session = Session()
+    session = get_session()
     user = session.query(User).filter_by(id=user_id).first()
 
     if not user:
@@ -221,6 +217,8 @@ def update_profile():
 
     # Check if the old password is provided and validate it
     if old_password and not user.check_password(old_password):
+        # Discard the username/email changes made above
+        session.rollback()
         flash("Old password is incorrect.", "danger")
         return redirect(url_for('user_controller.get_profile'))
 
@@ -228,7 +226,6 @@ def update_profile():
         user.set_password(new_password)
 
     session.commit()
-    session.close()
 
     flash("Profile updated successfully", "success")
     return redirect(url_for('user_controller.get_profile'))
@@ -245,7 +242,14 @@ def update_profile():
     }
 })
 def logout():
+    grant_token = request.cookies.get(GRANT_COOKIE)
+    if grant_token:
+        session = get_session()
+        if revoke_grant(session, grant_token):
+            session.commit()
+
     response = make_response(redirect(url_for('home')))
     unset_jwt_cookies(response)
+    unset_grant_cookie(response)
     flash("You have been logged out.", "info")
     return response
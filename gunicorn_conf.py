@@ -0,0 +1,76 @@
+# Gunicorn settings for production, read by serve.py (or gunicorn -c gunicorn_conf.py).
+# Everything is sized from the CPU count and can be overridden from the
+# environment; see the Configuration table in the README.
+import gc
+import os
+
+CPU_COUNT = os.cpu_count() or 1
+
+# sync: one request per process. gthread: a few threads per process, so waits
+# on the database and the hash pool overlap. async: uvicorn workers serving
+# asgi.py, hundreds of requests per process.
+WORKER_CLASSES = {
+    'sync': ('sync', 'app:app'),
+    'gthread': ('gthread', 'app:app'),
+    'async': ('uvicorn.workers.UvicornWorker', 'asgi:application'),
+}
+WORKER_MODEL = os.getenv('WORKER_CLASS', 'gthread').lower()
+if WORKER_MODEL not in WORKER_CLASSES:
+    raise RuntimeError(f"WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, not {WORKER_MODEL!r}")
+worker_class, APP_MODULE = WORKER_CLASSES[WORKER_MODEL]
+
+
+def _default_workers():
+    # Async workers do not need extra processes to overlap I/O
+    if WORKER_MODEL == 'async':
+        return CPU_COUNT
+    return CPU_COUNT * 2 + 1
+
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', _default_workers()))
+threads = int(os.getenv('THREADS', 4 if WORKER_MODEL == 'gthread' else 1))
+
+# Import the app once in the master: workers fork with the code already loaded
+# and share its memory pages copy-on-write
+preload_app = os.getenv('PRELOAD_APP', 'true').lower() in ('1', 'true', 'yes')
+
+# Password confirmations can queue for the hash pool for HASH_TIMEOUT_SECONDS;
+# the worker timeout stays well above that so gunicorn never kills a request
+# that is still going to answer
+_hash_timeout = float(os.getenv('HASH_TIMEOUT_SECONDS', 10))
+timeout = int(os.getenv('WORKER_TIMEOUT', max(30, int(_hash_timeout * 3))))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('KEEPALIVE', 5))
+
+# Recycle workers now and then, spread out so they never restart together
+max_requests = int(os.getenv('MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', max_requests // 10))
+
+pidfile = os.getenv('GUNICORN_PIDFILE', '/tmp/gunicorn.pid')
+accesslog = os.getenv('ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info')
+
+# Connections each worker opens before it takes traffic (default DB_POOL_SIZE)
+WARM_CONNECTIONS = os.getenv('DB_POOL_WARM')
+
+
+def pre_fork(server, worker):
+    # Move everything the master has loaded out of the GC's reach, so the
+    # collector in each worker does not touch (and copy) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never share the master's pooled sockets with a worker
+    from connector.db import dispose_after_fork
+    dispose_after_fork()
+
+
+def post_worker_init(worker):
+    if WORKER_MODEL == 'async':
+        return
+    from connector.db import warm_pool
+    count = warm_pool(int(WARM_CONNECTIONS) if WARM_CONNECTIONS else None)
+    worker.log.info("Worker %s warmed %d database connections", worker.pid, count)
@@ -0,0 +1,28 @@
+# Adds the composite transaction indexes to an existing database.
+# Safe to run more than once: indexes that already exist are skipped.
+#
+#   python -m migrations.add_transaction_indexes [downgrade]
+import sys
+from connector.db import engine
+from models.transaction import Transaction
+import models.account  # noqa: F401  (resolve relationships)
+import models.user  # noqa: F401
+
+
+def upgrade():
+    for index in Transaction.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+        print(f"Index {index.name} ready")
+
+
+def downgrade():
+    for index in Transaction.__table__.indexes:
+        index.drop(bind=engine, checkfirst=True)
+        print(f"Index {index.name} dropped")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['downgrade']:
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,19 @@
+# Creates any tables declared in models/ that the database does not have yet.
+# Existing tables are left untouched.
+#
+#   python -m migrations.create_tables
+from connector.db import Base, engine
+import models.user  # noqa: F401
+import models.account  # noqa: F401
+import models.transaction  # noqa: F401
+import models.revoked_grant  # noqa: F401
+import models.grant_spend  # noqa: F401
+import models.transaction_rollup  # noqa: F401
+import models.account_balance_slot  # noqa: F401
+import models.journal_line  # noqa: F401
+import models.balance_checkpoint  # noqa: F401
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(engine, checkfirst=True)
+    print("Tables ready: " + ", ".join(sorted(Base.metadata.tables)))
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, DECIMAL, ForeignKey
+from connector.db import Base
+
+class AccountBalanceSlot(Base):
+    __tablename__ = 'account_balance_slots'
+
+    # A hot account's balance is accounts.balance plus the sum of its slots
+    account_id = Column(Integer, ForeignKey('accounts.id', ondelete='CASCADE'), primary_key=True)
+    slot = Column(Integer, primary_key=True)
+    balance = Column(DECIMAL(10, 2), nullable=False, default=0.00)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DECIMAL, DateTime
+from connector.db import Base
+
+class BalanceCheckpoint(Base):
+    __tablename__ = 'balance_checkpoints'
+
+    # The account's balance including every journal line up to journal_line_id;
+    # as_of is the created_at of that line
+    account_id = Column(Integer, primary_key=True)
+    journal_line_id = Column(Integer, primary_key=True)
+    balance = Column(DECIMAL(16, 2), nullable=False)
+    as_of = Column(DateTime, nullable=False)
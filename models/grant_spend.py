@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime, DECIMAL
+from connector.db import Base
+
+class GrantSpend(Base):
+    __tablename__ = 'grant_spends'
+
+    # Running total of what a transaction grant has authorized, by its jti
+    jti = Column(String(36), primary_key=True)
+    spent = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, Index, event
+from datetime import datetime
+from connector.db import Base
+
+class JournalLine(Base):
+    __tablename__ = 'journal_lines'
+
+    # Append-only: every posting writes one debit and one credit line sharing a
+    # posting_id. account_id is NULL for the outside world (cash in or out).
+    # No FK to accounts, so deleting an account never rewrites the ledger.
+    id = Column(Integer, primary_key=True)
+    posting_id = Column(String(32), nullable=False)
+    account_id = Column(Integer, nullable=True)
+    entry = Column(String(6), nullable=False)  # 'debit' or 'credit'
+    amount = Column(DECIMAL(10, 2), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_journal_lines_account_id', 'account_id', 'id'),
+        Index('ix_journal_lines_posting_id', 'posting_id'),
+    )
+
+
+@event.listens_for(JournalLine, 'before_update')
+@event.listens_for(JournalLine, 'before_delete')
+def _append_only(mapper, connection, target):
+    raise RuntimeError("journal_lines is append-only; post a reversing entry instead")
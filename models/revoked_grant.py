@@ -0,0 +1,8 @@
+from sqlalchemy import Column, String, DateTime
+from connector.db import Base
+
+class RevokedGrant(Base):
+    __tablename__ = 'revoked_grants'
+
+    jti = Column(String(36), primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from connector.db import Base
@@ -17,3 +17,10 @@ class Transaction(Base):
     # Define relationships
     from_account = relationship("Account", foreign_keys=[from_account_id], back_populates="transactions_from")
     to_account = relationship("Account", foreign_keys=[to_account_id], back_populates="transactions_to")
+
+    # Composite indexes backing the per-side history lookups and type filters
+    __table_args__ = (
+        Index('ix_transactions_from_account_created', 'from_account_id', 'created_at'),
+        Index('ix_transactions_to_account_created', 'to_account_id', 'created_at'),
+        Index('ix_transactions_type_created', 'type', 'created_at'),
+    )
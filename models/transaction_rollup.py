@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DECIMAL, ForeignKey
+from connector.db import Base
+
+class TransactionRollup(Base):
+    __tablename__ = 'transaction_rollups'
+
+    account_id = Column(Integer, ForeignKey('accounts.id'), primary_key=True)
+    period = Column(String(10), primary_key=True)  # 'YYYY-MM' for months, 'YYYY-MM-DD' for days (UTC)
+    type = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum_in = Column(DECIMAL(16, 2), nullable=False, default=0)
+    sum_out = Column(DECIMAL(16, 2), nullable=False, default=0)
@@ -0,0 +1,21 @@
+# Rebuilds transaction_rollups from the full transactions history.
+# Run it once after creating the table (python -m migrations.create_tables) and
+# whenever the rollups need to be rebuilt. Pause postings while it runs: it
+# replaces every rollup row in a single DB transaction.
+#
+#   python -m scripts.backfill_rollups
+import time
+from sqlalchemy import select, func
+from connector.db import engine
+from services.rollup_service import backfill_rollups
+from models.transaction_rollup import TransactionRollup
+import models.account  # noqa: F401  (resolve relationships)
+import models.user  # noqa: F401
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        backfill_rollups(connection)
+        rows = connection.execute(select(func.count()).select_from(TransactionRollup.__table__)).scalar()
+    print(f"Rebuilt {rows} rollup rows in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,23 @@
+# Builds the OpenAPI spec once and writes it to the spec cache (APISPEC_CACHE_DIR,
+# keyed on the route modules' code version), so workers serve /apispec_1.json
+# from the file instead of walking every route. Run it at image build time:
+#
+#   python -m scripts.build_apispec
+import os
+import time
+
+os.environ['APIDOCS_ENABLED'] = 'true'
+
+from app import app, swagger  # noqa: E402
+from utils.apidoc import spec_cache_path, write_spec  # noqa: E402
+
+
+if __name__ == "__main__":
+    for spec_config in swagger.config['specs']:
+        endpoint = spec_config['endpoint']
+        started = time.perf_counter()
+        with app.test_request_context():
+            spec = swagger.build_apispecs(endpoint)
+        path = spec_cache_path(endpoint)
+        write_spec(path, spec)
+        print(f"Wrote {path} ({len(spec.get('paths', {}))} paths) in {time.perf_counter() - started:.2f}s")
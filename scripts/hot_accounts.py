@@ -0,0 +1,55 @@
+# Hot-account mode: splits a busy account's balance across N slot rows so
+# concurrent credits stop serializing on one row lock.
+#
+#   python -m scripts.hot_accounts enable 42 --slots 16
+#   python -m scripts.hot_accounts disable 42
+#   python -m scripts.hot_accounts compact --interval 5
+#
+# compact folds every hot account's slots back into accounts.balance; with
+# --interval it keeps running as the background compactor. Workers pick up
+# enabled/disabled accounts within HOT_ACCOUNTS_REFRESH_SECONDS.
+import argparse
+import time
+from connector.db import Session
+from services.hot_accounts import set_hot, compact
+import models.account  # noqa: F401  (resolve relationships)
+import models.user  # noqa: F401
+import models.transaction  # noqa: F401
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    enable = commands.add_parser('enable', help='Turn hot mode on, or change the slot count')
+    enable.add_argument('account_id', type=int)
+    enable.add_argument('--slots', type=int, default=16)
+    disable = commands.add_parser('disable', help='Fold the slots and turn hot mode off')
+    disable.add_argument('account_id', type=int)
+    compact_cmd = commands.add_parser('compact', help='Fold every hot account once, or every --interval seconds')
+    compact_cmd.add_argument('--interval', type=float, help='Keep compacting at this interval')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command in ('enable', 'disable'):
+        slots = args.slots if args.command == 'enable' else 0
+        if args.command == 'enable' and slots < 1:
+            raise SystemExit("--slots must be at least 1")
+        with Session() as session:
+            set_hot(session, args.account_id, slots)
+            session.commit()
+        print(f"Account {args.account_id}: {slots} balance slots" if slots else f"Account {args.account_id}: hot mode off")
+        return
+
+    while True:
+        started = time.perf_counter()
+        moved = compact(Session)
+        print(f"Folded {moved} into account balances in {time.perf_counter() - started:.2f}s", flush=True)
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Journal maintenance.
+#
+#   python -m scripts.journal open
+#   python -m scripts.journal checkpoint --interval 60
+#   python -m scripts.journal reconcile
+#
+# open writes an opening checkpoint (the current accounts.balance) for every
+# account without one; run it once, with postings paused, before the first
+# checkpoint and before switching to LEDGER_MODE=journal. checkpoint records
+# new balance checkpoints; with --interval it keeps running as the background
+# checkpointer, which keeps balance reads to a handful of recent lines.
+# reconcile lists accounts whose accounts.balance disagrees with the journal.
+import argparse
+import sys
+import time
+from connector.db import Session
+from services.journal import open_checkpoints, write_checkpoints, reconcile, CHECKPOINT_LAG_SECONDS
+import models.account  # noqa: F401  (resolve relationships)
+import models.user  # noqa: F401
+import models.transaction  # noqa: F401
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('open', help='Opening checkpoint for every account that has none')
+    checkpoint = commands.add_parser('checkpoint', help='Checkpoint every account with new lines, once or every --interval seconds')
+    checkpoint.add_argument('--interval', type=float, help='Keep checkpointing at this interval')
+    checkpoint.add_argument('--lag', type=float, default=CHECKPOINT_LAG_SECONDS,
+                            help='Leave lines younger than this many seconds for the next run')
+    commands.add_parser('reconcile', help='List accounts whose balance disagrees with the journal')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'open':
+        with Session() as session:
+            opened = open_checkpoints(session)
+            session.commit()
+        print(f"Opened {opened} accounts")
+        return
+
+    if args.command == 'reconcile':
+        with Session() as session:
+            mismatches = reconcile(session)
+        for account_id, balance, journal_balance in mismatches:
+            print(f"account {account_id}: balance {balance}, journal {journal_balance}")
+        print(f"{len(mismatches)} mismatched accounts")
+        sys.exit(1 if mismatches else 0)
+
+    while True:
+        started = time.perf_counter()
+        with Session() as session:
+            written = write_checkpoints(session, args.lag)
+            session.commit()
+        print(f"Wrote {written} checkpoints in {time.perf_counter() - started:.2f}s", flush=True)
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# Bulk loader for users, accounts and transactions.
+#
+# Rows go in through Core insert() executemany batches rather than the ORM, in
+# FK order (users, accounts, transactions). Secondary indexes are dropped for
+# the load and rebuilt afterwards, and rollups are rebuilt at the end.
+#
+#   python -m scripts.load_data generate --users 10000 --accounts 50000 --transactions 5000000
+#   python -m scripts.load_data import --users users.csv --accounts accounts.csv --transactions transactions.csv
+#
+# Generated data: every user has at least one account, traffic is skewed toward
+# a few hot accounts, debits never overdraw, and each account's balance equals
+# the sum of its generated history. All generated users share one password
+# hash (--password), computed once.
+#
+# Imported CSVs use the model column names as headers. Users need a
+# password_hash column (rows without one get the --password hash). Pass
+# --recompute-balances to derive balances from the imported history.
+import argparse
+import csv
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import insert, update, select, func, bindparam
+from werkzeug.security import generate_password_hash
+from connector.db import Base, engine as default_engine
+from models.user import User
+from models.account import Account
+from models.transaction import Transaction
+from services.rollup_service import backfill_rollups
+from services.journal import open_checkpoints
+import models.revoked_grant  # noqa: F401  (create_all covers every table)
+import models.grant_spend  # noqa: F401
+import models.transaction_rollup  # noqa: F401
+import models.account_balance_slot  # noqa: F401
+import models.journal_line  # noqa: F401
+import models.balance_checkpoint  # noqa: F401
+
+BATCH_ROWS = 20000
+# accounts.balance is DECIMAL(10, 2); generated credits stay well below its limit
+MAX_BALANCE_CENTS = 5000000000
+
+
+def hot_index(rng, size, skew=3.0):
+    # Larger skew concentrates more traffic on the lowest indexes
+    return min(int(size * rng.random() ** skew), size - 1)
+
+
+class Loader:
+    def __init__(self, engine, batch_rows=BATCH_ROWS):
+        self.engine = engine
+        self.batch_rows = batch_rows
+        self.counts = {}
+
+    def insert_rows(self, connection, model, rows):
+        # Buffers an iterable of row dicts into executemany batches
+        table = model.__table__
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                connection.execute(insert(table), batch)
+                self.counts[table.name] = self.counts.get(table.name, 0) + len(batch)
+                batch = []
+        if batch:
+            connection.execute(insert(table), batch)
+            self.counts[table.name] = self.counts.get(table.name, 0) + len(batch)
+
+    @contextmanager
+    def bulk_mode(self, connection):
+        # Secondary (non-unique) indexes are rebuilt once at the end instead of
+        # being maintained row by row
+        indexes = [index for model in (Account, Transaction) for index in model.__table__.indexes if not index.unique]
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('PRAGMA cache_size = -200000')
+        try:
+            yield
+        finally:
+            for index in indexes:
+                index.create(connection, checkfirst=True)
+
+    def next_id(self, connection, model):
+        return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate(engine, users, accounts, transactions, days=365, password='password', opening_balance=0,
+             email_domain='example.test', seed_value=42, loader=None):
+    if accounts < users:
+        raise ValueError("Need at least one account per user")
+    rng = random.Random(seed_value)
+    loader = loader or Loader(engine)
+    Base.metadata.create_all(engine)
+    password_hash = generate_password_hash(password)
+    now = datetime.utcnow()
+
+    with engine.begin() as connection, loader.bulk_mode(connection):
+        first_user = loader.next_id(connection, User)
+        first_account = loader.next_id(connection, Account)
+
+        loader.insert_rows(connection, User, (
+            {'id': first_user + i, 'username': f'user{first_user + i}', 'email': f'user{first_user + i}@{email_domain}',
+             'password_hash': password_hash, 'created_at': now, 'updated_at': now}
+            for i in range(users)
+        ))
+
+        owners = [first_user + (i if i < users else hot_index(rng, users)) for i in range(accounts)]
+        loader.insert_rows(connection, Account, (
+            {'id': first_account + i, 'user_id': owners[i], 'account_type': 'savings' if i % 2 else 'checking',
+             'account_number': f'{first_account + i:012d}', 'balance': 0, 'created_at': now, 'updated_at': now}
+            for i in range(accounts)
+        ))
+
+        # Balances are tracked in cents while generating so every debit can be
+        # checked and the final balances match the history exactly
+        balances = [0] * accounts
+        start = now - timedelta(days=days)
+        step = days * 86400 / max(transactions, 1)
+        opening_cents = int(Decimal(opening_balance) * 100)
+
+        def transaction_rows():
+            if opening_cents:
+                for index in range(accounts):
+                    balances[index] = opening_cents
+                    yield {'type': 'deposit', 'from_account_id': None, 'to_account_id': first_account + index,
+                           'amount': Decimal(opening_cents).scaleb(-2), 'description': 'opening balance',
+                           'created_at': start}
+            for i in range(transactions):
+                created_at = start + timedelta(seconds=i * step)
+                kind = rng.choice(('deposit', 'withdrawal', 'transfer', 'transfer'))
+                source = hot_index(rng, accounts)
+                target = hot_index(rng, accounts)
+                if kind == 'transfer' and source == target:
+                    target = (source + 1) % accounts
+                cents = rng.randint(100, 500000)
+                if kind != 'deposit' and balances[source] < cents:
+                    # Not enough money to move: fund the account instead
+                    kind, target = 'deposit', source
+                elif kind != 'withdrawal' and balances[target] + cents > MAX_BALANCE_CENTS:
+                    kind, source = 'withdrawal', target
+                if kind != 'deposit':
+                    balances[source] -= cents
+                if kind != 'withdrawal':
+                    balances[target] += cents
+                yield {
+                    'type': kind,
+                    'from_account_id': first_account + source if kind != 'deposit' else None,
+                    'to_account_id': first_account + target if kind != 'withdrawal' else None,
+                    'amount': Decimal(cents).scaleb(-2),
+                    'description': f'generated {kind}',
+                    'created_at': created_at,
+                }
+
+        loader.insert_rows(connection, Transaction, transaction_rows())
+
+        accounts_table = Account.__table__
+        balance_update = (
+            update(accounts_table)
+            .where(accounts_table.c.id == bindparam('account_id'))
+            .values(balance=bindparam('new_balance'))
+        )
+        changed = [{'account_id': first_account + i, 'new_balance': Decimal(cents).scaleb(-2)}
+                   for i, cents in enumerate(balances) if cents]
+        for offset in range(0, len(changed), loader.batch_rows):
+            connection.execute(balance_update, changed[offset:offset + loader.batch_rows])
+
+        backfill_rollups(connection)
+        # Loaded balances have no journal lines behind them: open them
+        open_checkpoints(connection)
+    return loader.counts
+
+
+def _read_csv(path, convert):
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield convert({key: (value if value != '' else None) for key, value in row.items()})
+
+
+def _datetime(value, default):
+    return datetime.fromisoformat(value) if value else default
+
+
+def import_csv(engine, users_path=None, accounts_path=None, transactions_path=None, password='password',
+               recompute_balances=False, loader=None):
+    loader = loader or Loader(engine)
+    Base.metadata.create_all(engine)
+    fallback_hash = generate_password_hash(password)
+    now = datetime.utcnow()
+
+    def user_row(row):
+        row['password_hash'] = row.get('password_hash') or fallback_hash
+        row['created_at'] = _datetime(row.get('created_at'), now)
+        row['updated_at'] = _datetime(row.get('updated_at'), now)
+        return row
+
+    def account_row(row):
+        row['balance'] = Decimal(row.get('balance') or 0)
+        row['created_at'] = _datetime(row.get('created_at'), now)
+        row['updated_at'] = _datetime(row.get('updated_at'), now)
+        return row
+
+    def transaction_row(row):
+        row['amount'] = Decimal(row['amount'])
+        row['created_at'] = _datetime(row.get('created_at'), now)
+        return row
+
+    with engine.begin() as connection:
+        with loader.bulk_mode(connection):
+            if users_path:
+                loader.insert_rows(connection, User, _read_csv(users_path, user_row))
+            if accounts_path:
+                loader.insert_rows(connection, Account, _read_csv(accounts_path, account_row))
+            if transactions_path:
+                loader.insert_rows(connection, Transaction, _read_csv(transactions_path, transaction_row))
+        # Runs against the rebuilt indexes
+        if recompute_balances:
+            recompute_account_balances(connection)
+        backfill_rollups(connection)
+        # Loaded balances have no journal lines behind them: open them
+        open_checkpoints(connection)
+    return loader.counts
+
+
+def recompute_account_balances(connection):
+    # balance = everything credited to the account minus everything debited
+    # from it; one sum per side so each can use its account index
+    def side_total(column):
+        return (
+            select(func.coalesce(func.sum(Transaction.amount), 0))
+            .where(column == Account.id)
+            .scalar_subquery()
+        )
+    connection.execute(update(Account.__table__).values(
+        balance=side_total(Transaction.to_account_id) - side_total(Transaction.from_account_id)
+    ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load users, accounts and transactions")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--password', default='password', help='Password behind the shared precomputed hash')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='Generate a synthetic, internally consistent dataset')
+    gen.add_argument('--users', type=int, required=True)
+    gen.add_argument('--accounts', type=int, required=True)
+    gen.add_argument('--transactions', type=int, required=True)
+    gen.add_argument('--days', type=int, default=365, help='History length the transactions are spread over')
+    gen.add_argument('--opening-balance', default='0', help='Deposit made into every account before the history')
+    gen.add_argument('--seed', type=int, default=42)
+
+    imp = commands.add_parser('import', help='Load CSV files with model column names as headers')
+    imp.add_argument('--users')
+    imp.add_argument('--accounts')
+    imp.add_argument('--transactions')
+    imp.add_argument('--recompute-balances', action='store_true')
+
+    args = parser.parse_args(argv)
+    loader = Loader(default_engine, batch_rows=args.batch_rows)
+    started = time.perf_counter()
+    if args.command == 'generate':
+        counts = generate(default_engine, args.users, args.accounts, args.transactions, days=args.days,
+                          password=args.password, opening_balance=args.opening_balance, seed_value=args.seed,
+                          loader=loader)
+    else:
+        counts = import_csv(default_engine, args.users, args.accounts, args.transactions, password=args.password,
+                            recompute_balances=args.recompute_balances, loader=loader)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(", ".join(f"{count} {table}" for table, count in counts.items()) +
+          f" loaded in {elapsed:.1f}s ({total / elapsed * 60:,.0f} rows/min)")
+
+
+if __name__ == "__main__":
+    main()
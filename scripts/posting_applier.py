@@ -0,0 +1,88 @@
+# The single writer for POSTING_QUEUE mode: drains the local posting log into
+# the database in batches, one commit per batch.
+#
+#   python -m scripts.posting_applier
+#   python -m scripts.posting_applier --batch 1000 --idle 0.02
+#
+# Run exactly one per web host, next to the gunicorn workers that share its
+# POSTING_QUEUE_PATH; a second copy exits instead of competing for the lock.
+import argparse
+import fcntl
+import sys
+import time
+import traceback
+from sqlalchemy.exc import OperationalError
+from connector.db import Session
+from services import posting_queue
+import models.account  # noqa: F401  (resolve relationships)
+import models.user  # noqa: F401
+import models.transaction  # noqa: F401
+
+PRUNE_EVERY_SECONDS = 60
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default=posting_queue.POSTING_QUEUE_PATH)
+    parser.add_argument('--batch', type=int, default=posting_queue.POSTING_QUEUE_BATCH, help='Most postings per commit')
+    parser.add_argument('--idle', type=float, default=0.05, help='Seconds to sleep when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='Drain what is queued now, then exit')
+    return parser.parse_args(argv)
+
+
+def single_writer(path):
+    # Held for the life of the process; the OS drops it if the applier dies
+    lock = open(f"{path}.lock", 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        sys.exit(f"Another applier is already draining {path}")
+    return lock
+
+
+def drain(path, batch_size):
+    # One batch; returns (postings taken, postings settled), (0, 0) when the
+    # queue is empty. A batch that fails as a whole is retried one posting at a
+    # time, so a bad posting only costs itself an attempt.
+    batch = posting_queue.pending(batch_size, path)
+    if not batch:
+        return 0, 0
+    try:
+        with Session() as session:
+            outcomes = posting_queue.apply_batch(session, batch)
+    except OperationalError:
+        raise
+    except Exception:
+        traceback.print_exc()
+        outcomes = posting_queue.apply_singly(Session, batch)
+    posting_queue.finish(outcomes, path)
+    return len(batch), sum(1 for _, status, _ in outcomes if status != posting_queue.PENDING)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    lock = single_writer(args.path)  # noqa: F841
+    pruned_at = time.monotonic()
+    while True:
+        started = time.perf_counter()
+        try:
+            taken, settled = drain(args.path, args.batch)
+        except OperationalError:
+            # The database is unreachable or timed out: nothing was charged an
+            # attempt, so wait and take the same batch again
+            traceback.print_exc()
+            time.sleep(max(args.idle, 1))
+            continue
+        if settled:
+            print(f"Settled {settled} of a batch of {taken} in {time.perf_counter() - started:.3f}s", flush=True)
+            continue
+        if args.once and not taken:
+            return
+        if time.monotonic() - pruned_at > PRUNE_EVERY_SECONDS:
+            posting_queue.prune(path=args.path)
+            pruned_at = time.monotonic()
+        time.sleep(args.idle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Production server launcher.
+#
+#   python -m serve              start gunicorn with gunicorn_conf.py
+#   python -m serve restart      warm restart onto the current code
+#
+# WORKER_CLASS picks sync, gthread (default) or async (uvicorn workers on
+# asgi.py); workers and threads are sized from the CPU count unless
+# WEB_CONCURRENCY / THREADS are set.
+#
+# A warm restart asks the running master for a new master (SIGUSR2), which
+# loads the new code and forks its workers while the old ones keep serving.
+# Once the new master is up, the old one gets SIGTERM and finishes its in-flight
+# requests. Inside a container where gunicorn is PID 1, roll containers instead.
+import argparse
+import os
+import signal
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(ROOT, 'gunicorn_conf.py')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='start', choices=('start', 'restart'))
+    parser.add_argument('--pidfile', default=os.getenv('GUNICORN_PIDFILE', '/tmp/gunicorn.pid'))
+    parser.add_argument('--settle', type=float, default=float(os.getenv('RESTART_SETTLE_SECONDS', 5)),
+                        help='Seconds the new workers get to boot before the old master stops')
+    parser.add_argument('--timeout', type=float, default=60, help='Longest to wait for the new master')
+    return parser.parse_args(argv)
+
+
+def start():
+    import gunicorn_conf
+    # exec so gunicorn is the process that receives the platform's signals
+    argv = [sys.executable, '-m', 'gunicorn', '--config', CONFIG_PATH, gunicorn_conf.APP_MODULE]
+    print(f"Starting {gunicorn_conf.workers} {gunicorn_conf.WORKER_MODEL} workers x {gunicorn_conf.threads} threads "
+          f"on {gunicorn_conf.bind} (preload={gunicorn_conf.preload_app})", flush=True)
+    os.chdir(ROOT)
+    os.execv(sys.executable, argv)
+
+
+def read_pid(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def restart(pidfile, settle, timeout):
+    old_pid = read_pid(pidfile)
+    if old_pid is None or not alive(old_pid):
+        sys.exit(f"No running gunicorn master in {pidfile}")
+
+    os.kill(old_pid, signal.SIGUSR2)
+    deadline = time.monotonic() + timeout
+    new_pid = None
+    # The new master takes over the pidfile; the old one moves to .oldbin
+    while time.monotonic() < deadline:
+        pid = read_pid(pidfile)
+        if pid and pid != old_pid and alive(pid):
+            new_pid = pid
+            break
+        time.sleep(0.2)
+    if new_pid is None:
+        sys.exit(f"New master did not start within {timeout:.0f}s; the old master {old_pid} keeps serving")
+
+    time.sleep(settle)
+    if not alive(new_pid):
+        sys.exit(f"New master {new_pid} exited while booting; the old master {old_pid} keeps serving")
+    os.kill(old_pid, signal.SIGTERM)
+    print(f"Restarted: master {old_pid} -> {new_pid}; {old_pid} is draining its requests")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'restart':
+        restart(args.pidfile, args.settle, args.timeout)
+    else:
+        start()
+
+
+if __name__ == "__main__":
+    main()
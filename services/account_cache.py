@@ -0,0 +1,96 @@
+import threading
+from collections import namedtuple
+from sqlalchemy import event, select
+from connector.db import RoutingSession
+from models.account import Account
+from services.journal import balance_column
+from services.cache import build_cache
+
+# What the account pages and dropdowns need from an account. Ownership checks
+# read the database instead (transaction_service.user_account_ids).
+AccountSummary = namedtuple('AccountSummary', ['id', 'account_type', 'account_number', 'balance', 'updated_at'])
+
+cache = build_cache()
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _key(user_id):
+    return f"accounts:{user_id}"
+
+
+def _bump(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_account_summaries(session, user_id, version=None):
+    # The user's accounts, ordered by id, from the cache when possible. With a
+    # ListingVersion read from the database, a cached list that does not match
+    # it (another worker changed the accounts) is reloaded instead of served.
+    summaries = cache.get(_key(user_id))
+    if summaries is not None and (version is None or _matches(summaries, version)):
+        _bump('hits')
+        return summaries
+    _bump('misses')
+    summaries = [AccountSummary(*row) for row in session.execute(
+        _summary_select().where(Account.user_id == user_id).order_by(Account.id)
+    )]
+    cache.set(_key(user_id), summaries)
+    return summaries
+
+
+def _summary_select():
+    # Hot-account slots or the journal, depending on LEDGER_MODE
+    return select(Account.id, Account.account_type, Account.account_number, balance_column(Account.id),
+                  Account.updated_at)
+
+
+def _matches(summaries, version):
+    # The balance total catches postings that leave accounts.updated_at alone
+    # (hot-account slots, journal mode)
+    return (len(summaries) == version.account_count
+            and sum(summary.balance for summary in summaries) == (version.balance_total or 0)
+            and max((summary.updated_at for summary in summaries), default=None) == version.accounts_updated_at)
+
+
+def get_account_summary(session, user_id, account_id):
+    # Single-account pages read their one row by primary key rather than the
+    # cached list, which another worker's postings may have left stale
+    try:
+        account_id = int(account_id)
+    except (TypeError, ValueError):
+        return None
+    row = session.execute(_summary_select().where(Account.id == account_id, Account.user_id == user_id)).first()
+    return AccountSummary(*row) if row else None
+
+
+def accounts_changed(session, user_id):
+    # Call whenever the user's accounts or balances change. The cache entry is
+    # dropped once the session commits, so a concurrent reader cannot refill it
+    # from the old rows in between.
+    session.info.setdefault('accounts_changed', set()).add(str(user_id))
+
+
+def invalidate_accounts(user_id):
+    cache.delete(_key(user_id))
+    _bump('invalidations')
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop('accounts_changed', ()):
+        invalidate_accounts(user_id)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('accounts_changed', None)
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot['backend'] = type(cache).__name__
+    return snapshot
@@ -0,0 +1,299 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select, update, insert, bindparam
+from models.account import Account
+from models.transaction import Transaction
+from services.account_cache import accounts_changed
+from services.rollup_service import record_rollups
+from services.hot_accounts import credit_slot, fold_slots, is_hot
+from services.journal import journal_mode, locked_balance, record_postings, record_adjustment
+
+TRANSACTION_TYPES = ('deposit', 'withdrawal', 'transfer')
+# transactions.amount is DECIMAL(10, 2) and description VARCHAR(255): larger
+# values fail on the INSERT (DataError on strict MySQL) instead of as a BalanceError
+MAX_AMOUNT = Decimal('99999999.99')
+MAX_DESCRIPTION_LENGTH = 255
+
+
+class BalanceError(Exception):
+    pass
+
+
+class InvalidAccount(BalanceError):
+    pass
+
+
+class InsufficientFunds(BalanceError):
+    pass
+
+
+class BatchRejected(BalanceError):
+    # Raised by post_batch(atomic=True); carries the per-item results
+    def __init__(self, results):
+        super().__init__("Batch rejected")
+        self.results = results
+
+
+def _owned(session, user_id, account_id, lock=False):
+    statement = select(Account.id).where(Account.id == account_id, Account.user_id == user_id)
+    if lock:
+        statement = statement.with_for_update()
+    if session.execute(statement).first() is None:
+        raise InvalidAccount("Invalid accounts selected or unauthorized access")
+
+
+def check_amount(amount):
+    if not isinstance(amount, Decimal) or not amount.is_finite() or amount <= 0:
+        raise BalanceError("Amount must be greater than zero")
+    if amount > MAX_AMOUNT:
+        raise BalanceError(f"Amount must be at most {MAX_AMOUNT}")
+    if amount != amount.quantize(Decimal('0.01')):
+        raise BalanceError("Amount must have at most two decimal places")
+
+
+def check_description(description):
+    if len(description or '') > MAX_DESCRIPTION_LENGTH:
+        raise BalanceError(f"Description must be at most {MAX_DESCRIPTION_LENGTH} characters")
+
+
+def _account_id(value):
+    # Form values arrive as strings; anything that is not an id is an invalid account
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        raise InvalidAccount("Invalid accounts selected or unauthorized access")
+
+
+def credit(session, user_id, account_id, amount):
+    # In journal mode the credit is only its journal line: nothing to lock
+    if journal_mode():
+        _owned(session, user_id, account_id)
+        return
+    # Hot accounts take the credit on one of their slots instead of the main row
+    if credit_slot(session, user_id, account_id, amount):
+        return
+    # UPDATE accounts SET balance = balance + :amt WHERE id = :id AND user_id = :uid
+    result = session.execute(
+        update(Account)
+        .where(Account.id == account_id, Account.user_id == user_id)
+        .values(balance=Account.balance + amount)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise InvalidAccount("Invalid accounts selected or unauthorized access")
+
+
+def debit(session, user_id, account_id, amount, label='withdrawal'):
+    if journal_mode():
+        # The account row lock serializes debits from this account; credits
+        # into it never wait on it
+        _owned(session, user_id, account_id, lock=True)
+        if locked_balance(session, account_id) < amount:
+            raise InsufficientFunds(f"Insufficient funds for {label}")
+        return
+    # A hot account's money may sit in its slots: fold them in so the balance
+    # check below sees the full total
+    if is_hot(session, account_id):
+        fold_slots(session, account_id)
+    # UPDATE accounts SET balance = balance - :amt
+    # WHERE id = :id AND user_id = :uid AND balance >= :amt
+    result = session.execute(
+        update(Account)
+        .where(Account.id == account_id, Account.user_id == user_id, Account.balance >= amount)
+        .values(balance=Account.balance - amount)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        # Only the failure path pays for telling the two causes apart
+        if session.query(Account.id).filter_by(id=account_id, user_id=user_id).first() is None:
+            raise InvalidAccount("Invalid accounts selected or unauthorized access")
+        raise InsufficientFunds(f"Insufficient funds for {label}")
+
+
+def post_transaction(session, user_id, transaction_type, amount, from_account_id=None, to_account_id=None, description=''):
+    # Applies the balance changes and adds the Transaction row to the session.
+    # Nothing is committed here: the caller commits on success and rolls back on
+    # BalanceError, so the balances and the insert land in one DB transaction.
+    if transaction_type not in TRANSACTION_TYPES:
+        raise BalanceError("Invalid transaction type")
+    check_amount(amount)
+    check_description(description)
+    from_account_id = _account_id(from_account_id) if transaction_type != 'deposit' else None
+    to_account_id = _account_id(to_account_id) if transaction_type != 'withdrawal' else None
+
+    if transaction_type == 'deposit':
+        if not to_account_id:
+            raise InvalidAccount("Invalid accounts selected or unauthorized access")
+        credit(session, user_id, to_account_id, amount)
+
+    elif transaction_type == 'withdrawal':
+        if not from_account_id:
+            raise InvalidAccount("Invalid accounts selected or unauthorized access")
+        debit(session, user_id, from_account_id, amount)
+
+    else:
+        if not from_account_id or not to_account_id or from_account_id == to_account_id:
+            raise InvalidAccount("Invalid accounts selected or unauthorized access")
+        # Each UPDATE takes its row lock as it runs, so touching the rows in
+        # account-id order gives every concurrent transfer the same lock order.
+        for account_id in sorted((from_account_id, to_account_id)):
+            if account_id == from_account_id:
+                debit(session, user_id, account_id, amount, 'transfer')
+            else:
+                credit(session, user_id, account_id, amount)
+
+    accounts_changed(session, user_id)
+    transaction = Transaction(
+        type=transaction_type,
+        from_account_id=from_account_id,
+        to_account_id=to_account_id,
+        amount=amount,
+        description=description,
+        created_at=datetime.utcnow()
+    )
+    session.add(transaction)
+    posting = {
+        'type': transaction_type,
+        'from_account_id': from_account_id,
+        'to_account_id': to_account_id,
+        'amount': amount,
+        'created_at': transaction.created_at
+    }
+    record_rollups(session, [posting])
+    record_postings(session, [posting])
+    return transaction
+
+
+def set_balance(session, account_id, new_balance):
+    # Manual correction to an exact balance, journaled as an adjustment for the
+    # difference. The caller has checked ownership.
+    if journal_mode():
+        session.execute(select(Account.id).where(Account.id == account_id).with_for_update())
+        record_adjustment(session, account_id, new_balance - locked_balance(session, account_id))
+        # No balance column moves, so bump updated_at for the listing caches
+        session.execute(
+            update(Account).where(Account.id == account_id).values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return
+    # The new value is the whole balance: empty any hot-account slots first
+    fold_slots(session, account_id)
+    current = session.execute(select(Account.balance).where(Account.id == account_id).with_for_update()).scalar()
+    record_adjustment(session, account_id, new_balance - current)
+    session.execute(
+        update(Account).where(Account.id == account_id).values(balance=new_balance)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def parse_batch_item(item):
+    # Normalizes one batch entry into (type, amount, from_id, to_id, description)
+    if not isinstance(item, dict):
+        raise BalanceError("Each item must be an object")
+    transaction_type = item.get('type')
+    if transaction_type not in TRANSACTION_TYPES:
+        raise BalanceError("Invalid transaction type")
+    try:
+        amount = Decimal(str(item.get('amount')))
+    except InvalidOperation:
+        raise BalanceError("Invalid amount")
+    check_amount(amount)
+    description = str(item.get('description') or '')
+    check_description(description)
+    try:
+        from_account_id = int(item['from_account_id']) if transaction_type != 'deposit' else None
+        to_account_id = int(item['to_account_id']) if transaction_type != 'withdrawal' else None
+    except (KeyError, TypeError, ValueError):
+        raise InvalidAccount("Invalid accounts selected or unauthorized access")
+    if transaction_type == 'transfer' and from_account_id == to_account_id:
+        raise InvalidAccount("Invalid accounts selected or unauthorized access")
+    return transaction_type, amount, from_account_id, to_account_id, description
+
+
+def post_batch(session, user_id, items, atomic=False, posting_ids=None):
+    # Posts many transactions with one locking read and one balance UPDATE per
+    # touched account and one bulk INSERT, all committed together by the caller.
+    # Items are checked in order against a running balance; failing items are
+    # reported and skipped, or abort the whole batch when atomic is set.
+    # posting_ids, parallel to items, names each item's journal entry.
+    results = []
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append((index, parse_batch_item(item)))
+        except BalanceError as e:
+            results.append({'index': index, 'status': 'rejected', 'error': str(e)})
+
+    account_ids = {account_id for _, (_, _, from_id, to_id, _) in parsed for account_id in (from_id, to_id) if account_id}
+    if journal_mode():
+        # Lock the accounts in id order, then read their journal balances
+        owned = session.query(Account.id) \
+            .filter(Account.id.in_(account_ids), Account.user_id == user_id) \
+            .order_by(Account.id).with_for_update().all() if account_ids else []
+        balances = {account_id: locked_balance(session, account_id) for account_id, in owned}
+    else:
+        # Lock every referenced account in id order before any balance moves.
+        # A hot account's slots are folded (slots, then its row) as its turn
+        # comes, so the batch takes its locks in the same order as a transfer.
+        balances = {}
+        for account_id in sorted(account_ids):
+            if is_hot(session, account_id):
+                fold_slots(session, account_id)
+            balance = session.execute(
+                select(Account.balance)
+                .where(Account.id == account_id, Account.user_id == user_id)
+                .with_for_update()
+            ).scalar()
+            if balance is not None:
+                balances[account_id] = balance
+
+    deltas = {}
+    rows = []
+    postings = []
+    now = datetime.utcnow()
+    for index, (transaction_type, amount, from_id, to_id, description) in parsed:
+        if (from_id and from_id not in balances) or (to_id and to_id not in balances):
+            results.append({'index': index, 'status': 'rejected', 'error': "Invalid accounts selected or unauthorized access"})
+            continue
+        if from_id and balances[from_id] < amount:
+            results.append({'index': index, 'status': 'rejected', 'error': f"Insufficient funds for {transaction_type}"})
+            continue
+        if from_id:
+            balances[from_id] -= amount
+            deltas[from_id] = deltas.get(from_id, 0) - amount
+        if to_id:
+            balances[to_id] += amount
+            deltas[to_id] = deltas.get(to_id, 0) + amount
+        rows.append({
+            'type': transaction_type,
+            'from_account_id': from_id,
+            'to_account_id': to_id,
+            'amount': amount,
+            'description': description,
+            'created_at': now
+        })
+        postings.append(dict(rows[-1], posting_id=posting_ids[index]) if posting_ids else rows[-1])
+        results.append({'index': index, 'status': 'applied'})
+
+    results.sort(key=lambda result: result['index'])
+    if atomic and len(rows) != len(items):
+        raise BatchRejected(results)
+
+    deltas = {account_id: delta for account_id, delta in deltas.items() if delta}
+    if deltas and not journal_mode():
+        accounts = Account.__table__
+        result = session.execute(
+            update(accounts)
+            .where(accounts.c.id == bindparam('account_id'), accounts.c.user_id == user_id,
+                   accounts.c.balance + bindparam('delta') >= 0)
+            .values(balance=accounts.c.balance + bindparam('delta'), updated_at=now),
+            [{'account_id': account_id, 'delta': delta} for account_id, delta in sorted(deltas.items())]
+        )
+        if session.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(deltas):
+            raise BalanceError("Account balances changed during the batch, please retry")
+    if rows:
+        session.execute(insert(Transaction), rows)
+        record_rollups(session, rows)
+        record_postings(session, postings)
+        accounts_changed(session, user_id)
+    return results
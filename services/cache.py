@@ -0,0 +1,93 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    # In-process cache with a size bound and per-entry TTL. Each gunicorn
+    # worker has its own copy, so invalidations only reach the local process;
+    # the TTL bounds how stale other workers can be.
+    def __init__(self, maxsize=10000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    # Shared cache for multi-worker deployments; needs the optional redis package
+    def __init__(self, url, ttl=30, prefix='bank:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(int(self.ttl), 1))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+def build_cache():
+    backend = os.getenv('CACHE_BACKEND', 'lru').lower()
+    ttl = float(os.getenv('CACHE_TTL_SECONDS', 30))
+    if backend == 'redis':
+        return RedisCache(os.getenv('CACHE_URL', 'redis://localhost:6379/0'), ttl=ttl)
+    if backend == 'none':
+        return NullCache()
+    return LRUCache(maxsize=int(os.getenv('CACHE_MAX_ENTRIES', 10000)), ttl=ttl)
@@ -0,0 +1,105 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+import jwt
+from flask import current_app, request
+from sqlalchemy import select
+from models.grant_spend import GrantSpend
+from models.revoked_grant import RevokedGrant
+
+# A transaction grant is a short-lived signed token handed out after one
+# successful password confirmation. While it is valid, postings skip the
+# PBKDF2 check until together they reach its amount ceiling; what it has
+# authorized so far is kept server-side in grant_spends.
+GRANT_COOKIE = 'txn_grant'
+GRANT_AUDIENCE = 'txn-grant'
+GRANT_TTL_SECONDS = int(os.getenv('TXN_GRANT_TTL_SECONDS', 300))
+GRANT_MAX_AMOUNT = Decimal(os.getenv('TXN_GRANT_MAX_AMOUNT', '1000'))
+
+
+def issue_grant(session, user_id):
+    # Adds the grant's spend row to the session; commit it before posting, so
+    # a posting that fails does not take the grant with it
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=GRANT_TTL_SECONDS)
+    claims = {
+        'sub': str(user_id),
+        'jti': str(uuid.uuid4()),
+        'iat': now,
+        'exp': expires_at,
+        'aud': GRANT_AUDIENCE,
+        'scope': 'transactions',
+        'max_amount': str(GRANT_MAX_AMOUNT),
+    }
+    # Expired grants can no longer be used, so drop their totals while we are here
+    session.query(GrantSpend).filter(GrantSpend.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    session.add(GrantSpend(jti=claims['jti'], spent=Decimal('0'), expires_at=expires_at.replace(tzinfo=None)))
+    return jwt.encode(claims, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+
+def decode_grant(token):
+    # Signature, expiry and audience only; returns None for anything invalid
+    if not token:
+        return None
+    try:
+        claims = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'], audience=GRANT_AUDIENCE)
+    except jwt.InvalidTokenError:
+        return None
+    return claims if claims.get('scope') == 'transactions' else None
+
+
+def current_grant(user_id):
+    # The request's grant claims if they belong to this user, without the revocation lookup
+    claims = decode_grant(request.cookies.get(GRANT_COOKIE))
+    if claims and claims.get('sub') == str(user_id):
+        return claims
+    return None
+
+
+def grant_covers(session, user_id, amount):
+    # True when the request carries a live, unrevoked grant for this user with
+    # room for the amount under its ceiling. The amount is charged to the grant
+    # in the caller's transaction, so a posting that rolls back gets it back;
+    # the spend row is locked so concurrent requests cannot both take the room.
+    claims = current_grant(user_id)
+    if not claims:
+        return False
+    try:
+        ceiling = Decimal(claims.get('max_amount'))
+    except (TypeError, InvalidOperation):
+        return False
+    if session.get(RevokedGrant, claims['jti']) is not None:
+        return False
+    spend = session.execute(
+        select(GrantSpend).where(GrantSpend.jti == claims['jti']).with_for_update()
+    ).scalar_one_or_none()
+    if spend is None or spend.spent + amount > ceiling:
+        return False
+    spend.spent += amount
+    return True
+
+
+def revoke_grant(session, token):
+    claims = decode_grant(token)
+    if not claims:
+        return False
+    # Expired entries can no longer be replayed, so drop them while we are here
+    session.query(RevokedGrant).filter(RevokedGrant.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+    if session.get(RevokedGrant, claims['jti']) is None:
+        session.add(RevokedGrant(jti=claims['jti'], expires_at=datetime.utcfromtimestamp(claims['exp'])))
+    return True
+
+
+def set_grant_cookie(response, token):
+    response.set_cookie(
+        GRANT_COOKIE, token,
+        max_age=GRANT_TTL_SECONDS,
+        secure=current_app.config.get('JWT_COOKIE_SECURE', False),
+        httponly=True,
+        samesite='Lax',
+    )
+
+
+def unset_grant_cookie(response):
+    response.delete_cookie(GRANT_COOKIE)
@@ -0,0 +1,133 @@
+import os
+import random
+import threading
+import time
+from sqlalchemy import select, update, delete, insert, func, type_coerce
+from models.account import Account
+from models.account_balance_slot import AccountBalanceSlot
+
+# Hot accounts (merchants, settlement) take a large share of all credits. In hot
+# mode an account's balance is split across N slot rows: each credit updates one
+# random slot, so concurrent deposits wait on 1/N of the row locks instead of
+# all queueing on accounts.balance. Debits fold the slots back first, and
+# compaction folds them periodically. Reads always report
+# accounts.balance + SUM(slots).
+HOT_ACCOUNTS_REFRESH_SECONDS = float(os.getenv('HOT_ACCOUNTS_REFRESH_SECONDS', 10))
+
+_lock = threading.Lock()
+_hot = {'loaded_at': float('-inf'), 'accounts': {}}
+
+
+def hot_accounts(session):
+    # account_id -> (owner user_id, slot count), re-read every
+    # HOT_ACCOUNTS_REFRESH_SECONDS so credits do not pay a lookup each
+    now = time.monotonic()
+    if now - _hot['loaded_at'] < HOT_ACCOUNTS_REFRESH_SECONDS:
+        return _hot['accounts']
+    rows = session.execute(
+        select(AccountBalanceSlot.account_id, Account.user_id, func.count())
+        .join(Account, Account.id == AccountBalanceSlot.account_id)
+        .group_by(AccountBalanceSlot.account_id, Account.user_id)
+    ).all()
+    with _lock:
+        _hot['accounts'] = {account_id: (user_id, slots) for account_id, user_id, slots in rows}
+        _hot['loaded_at'] = now
+    return _hot['accounts']
+
+
+def forget_hot_accounts():
+    with _lock:
+        _hot['loaded_at'] = float('-inf')
+
+
+def is_hot(session, account_id):
+    return int(account_id) in hot_accounts(session)
+
+
+def credit_slot(session, user_id, account_id, amount):
+    # Credits one random slot of a hot account owned by user_id. Returns False
+    # when the account is not (or no longer) hot, and the caller credits the
+    # main row instead.
+    try:
+        account_id = int(account_id)
+    except (TypeError, ValueError):
+        return False
+    hot = hot_accounts(session).get(account_id)
+    if hot is None or str(hot[0]) != str(user_id):
+        return False
+    result = session.execute(
+        update(AccountBalanceSlot)
+        .where(AccountBalanceSlot.account_id == account_id, AccountBalanceSlot.slot == random.randrange(hot[1]))
+        .values(balance=AccountBalanceSlot.balance + amount)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def fold_slots(session, account_id):
+    # Moves every slot's money into accounts.balance. Locks the slots before the
+    # account row, the order every path uses for a hot account.
+    slots = session.execute(
+        select(AccountBalanceSlot.balance)
+        .where(AccountBalanceSlot.account_id == int(account_id))
+        .with_for_update()
+    ).scalars().all()
+    total = sum(slots, 0)
+    if total:
+        session.execute(
+            update(AccountBalanceSlot)
+            .where(AccountBalanceSlot.account_id == int(account_id))
+            .values(balance=0)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(
+            update(Account)
+            .where(Account.id == int(account_id))
+            .values(balance=Account.balance + total)
+            .execution_options(synchronize_session=False)
+        )
+    return total
+
+
+def slot_total(account_id_column):
+    # Correlated SUM of an account's slots, 0 for accounts that are not hot
+    return func.coalesce(
+        select(func.sum(AccountBalanceSlot.balance))
+        .where(AccountBalanceSlot.account_id == account_id_column)
+        .scalar_subquery(),
+        0
+    )
+
+
+def account_balance():
+    # accounts.balance plus the slots, typed as the balance column so results
+    # keep its two decimal places instead of the driver's generic scale
+    return type_coerce(Account.balance + slot_total(Account.id), Account.balance.type)
+
+
+def set_hot(session, account_id, slots):
+    # slots > 0 turns hot mode on (or resizes it); 0 folds and turns it off
+    fold_slots(session, account_id)
+    existing = set(session.execute(
+        select(AccountBalanceSlot.slot).where(AccountBalanceSlot.account_id == int(account_id))
+    ).scalars())
+    session.execute(delete(AccountBalanceSlot).where(
+        AccountBalanceSlot.account_id == int(account_id), AccountBalanceSlot.slot >= slots
+    ))
+    missing = [{'account_id': int(account_id), 'slot': slot, 'balance': 0} for slot in range(slots) if slot not in existing]
+    if missing:
+        session.execute(insert(AccountBalanceSlot), missing)
+    forget_hot_accounts()
+
+
+def compact(session_factory):
+    # Folds every hot account, one short DB transaction per account so credits
+    # are only held up for one fold at a time. Returns the total moved.
+    with session_factory() as session:
+        account_ids = sorted(hot_accounts(session))
+    moved = 0
+    for account_id in account_ids:
+        with session_factory() as session:
+            moved += fold_slots(session, account_id)
+            session.commit()
+    return moved
@@ -0,0 +1,208 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select, insert, func, case, type_coerce
+from models.account import Account
+from models.journal_line import JournalLine
+from models.balance_checkpoint import BalanceCheckpoint
+from services.hot_accounts import account_balance
+
+# Double-entry journal. Every posting appends a debit and a credit line, and
+# periodic checkpoints record each account's balance up to a line id, so any
+# balance is its latest checkpoint plus the lines after it.
+#
+# LEDGER_MODE=balance (default) keeps accounts.balance as the live balance and
+# writes the journal alongside it. LEDGER_MODE=journal makes the journal the
+# balance: postings only insert lines, credits take no row lock at all and
+# debits lock only the account they draw from.
+LEDGER_MODE = os.getenv('LEDGER_MODE', 'balance').lower()
+# Lines younger than this are left out of new checkpoints: a DB transaction
+# still in flight may commit a lower line id after a higher one
+CHECKPOINT_LAG_SECONDS = float(os.getenv('CHECKPOINT_LAG_SECONDS', 60))
+
+
+def journal_mode():
+    return LEDGER_MODE == 'journal'
+
+
+_signed_amount = case((JournalLine.entry == 'credit', JournalLine.amount), else_=-JournalLine.amount)
+
+
+def posting_lines(from_account_id, to_account_id, amount, created_at, posting_id=None):
+    # Money leaves from_account (debit) and arrives in to_account (credit);
+    # None on either side is the outside world
+    posting_id = posting_id or uuid.uuid4().hex
+    return [
+        {'posting_id': posting_id, 'account_id': from_account_id, 'entry': 'debit', 'amount': amount, 'created_at': created_at},
+        {'posting_id': posting_id, 'account_id': to_account_id, 'entry': 'credit', 'amount': amount, 'created_at': created_at},
+    ]
+
+
+def record_postings(session, postings):
+    # postings: dicts with from_account_id, to_account_id, amount, created_at
+    # and optionally the posting_id to record them under
+    lines = [line for posting in postings for line in posting_lines(
+        posting.get('from_account_id'), posting.get('to_account_id'), posting['amount'], posting['created_at'],
+        posting.get('posting_id'))]
+    if lines:
+        session.execute(insert(JournalLine), lines)
+
+
+def record_adjustment(session, account_id, delta, created_at=None):
+    # Opening balances and manual corrections, posted against the outside world
+    if not delta:
+        return
+    created_at = created_at or datetime.utcnow()
+    if delta > 0:
+        record_postings(session, [{'from_account_id': None, 'to_account_id': account_id, 'amount': delta, 'created_at': created_at}])
+    else:
+        record_postings(session, [{'from_account_id': account_id, 'to_account_id': None, 'amount': -delta, 'created_at': created_at}])
+
+
+def journal_balance(account_id_column):
+    # Latest checkpoint plus the lines after it, as a SQL expression (correlated
+    # when given a column)
+    latest = select(BalanceCheckpoint).where(BalanceCheckpoint.account_id == account_id_column) \
+        .order_by(BalanceCheckpoint.journal_line_id.desc()).limit(1)
+    checkpoint_line = func.coalesce(latest.with_only_columns(BalanceCheckpoint.journal_line_id).scalar_subquery(), 0)
+    checkpoint_balance = func.coalesce(latest.with_only_columns(BalanceCheckpoint.balance).scalar_subquery(), 0)
+    since = func.coalesce(
+        select(func.sum(_signed_amount))
+        .where(JournalLine.account_id == account_id_column, JournalLine.id > checkpoint_line)
+        .scalar_subquery(),
+        0
+    )
+    return type_coerce(checkpoint_balance + since, Account.balance.type)
+
+
+def locked_balance(session, account_id):
+    # The journal balance for a debit's funds check. Locking reads see every
+    # committed line rather than the transaction's snapshot, and databases
+    # refuse FOR SHARE on aggregates, so the lines are summed here.
+    checkpoint = session.execute(
+        select(BalanceCheckpoint.journal_line_id, BalanceCheckpoint.balance)
+        .where(BalanceCheckpoint.account_id == int(account_id))
+        .order_by(BalanceCheckpoint.journal_line_id.desc()).limit(1)
+        .with_for_update(read=True)
+    ).first()
+    line_id, balance = checkpoint if checkpoint else (0, Decimal('0'))
+    amounts = session.execute(
+        select(_signed_amount)
+        .where(JournalLine.account_id == int(account_id), JournalLine.id > line_id)
+        .with_for_update(read=True)
+    ).scalars()
+    return balance + sum(amounts, Decimal('0'))
+
+
+def recorded_postings(session, posting_ids):
+    # The subset of posting_ids already in the journal
+    if not posting_ids:
+        return set()
+    return set(session.execute(
+        select(JournalLine.posting_id).where(JournalLine.posting_id.in_(posting_ids)).distinct()
+    ).scalars())
+
+
+def balance_column(account_id_column):
+    # The balance every read path reports for an account
+    if journal_mode():
+        return journal_balance(account_id_column)
+    return account_balance()
+
+
+def balance_at(session, account_id, at):
+    # Point-in-time balance: the last checkpoint at or before `at` plus the
+    # lines between it and `at`, so history is never scanned from the start.
+    # None when `at` falls before the journal covers the account.
+    checkpoint = session.execute(
+        select(BalanceCheckpoint.journal_line_id, BalanceCheckpoint.balance)
+        .where(BalanceCheckpoint.account_id == account_id, BalanceCheckpoint.as_of <= at)
+        .order_by(BalanceCheckpoint.journal_line_id.desc()).limit(1)
+    ).first()
+    if checkpoint is None and not _journaled_from_start(session, account_id):
+        return None
+    line_id, balance = checkpoint if checkpoint else (0, Decimal('0'))
+    since = session.execute(
+        select(func.sum(_signed_amount))
+        .where(JournalLine.account_id == account_id, JournalLine.id > line_id, JournalLine.created_at <= at)
+    ).scalar()
+    return balance + (since or 0)
+
+
+def _journaled_from_start(session, account_id):
+    # False when the journal lines do not add up to the account's first
+    # checkpoint (an opening balance from open_checkpoints) or, with no
+    # checkpoint yet, to its balance: its history predates the journal
+    first = session.execute(
+        select(BalanceCheckpoint.journal_line_id, BalanceCheckpoint.balance)
+        .where(BalanceCheckpoint.account_id == account_id)
+        .order_by(BalanceCheckpoint.journal_line_id).limit(1)
+    ).first()
+    if first is None and journal_mode():
+        return True
+    lines = select(func.sum(_signed_amount)).where(JournalLine.account_id == account_id)
+    if first is not None:
+        explained = session.execute(lines.where(JournalLine.id <= first.journal_line_id)).scalar()
+        return (explained or 0) == first.balance
+    explained = session.execute(lines).scalar()
+    return (explained or 0) == session.execute(select(account_balance()).where(Account.id == account_id)).scalar()
+
+
+def write_checkpoints(session, lag=CHECKPOINT_LAG_SECONDS):
+    # A new checkpoint for every account with lines since its last one, up to
+    # lines older than `lag`. Returns how many were written.
+    cutoff = datetime.utcnow() - timedelta(seconds=lag)
+    latest_line = select(BalanceCheckpoint.account_id, func.max(BalanceCheckpoint.journal_line_id).label('line_id')) \
+        .group_by(BalanceCheckpoint.account_id).subquery()
+    previous = {account_id: (line_id, balance) for account_id, line_id, balance in session.execute(
+        select(BalanceCheckpoint.account_id, BalanceCheckpoint.journal_line_id, BalanceCheckpoint.balance)
+        .join(latest_line, (latest_line.c.account_id == BalanceCheckpoint.account_id)
+              & (latest_line.c.line_id == BalanceCheckpoint.journal_line_id))
+    )}
+    candidates = session.execute(
+        select(JournalLine.account_id, func.max(JournalLine.id))
+        .where(JournalLine.account_id.isnot(None), JournalLine.created_at <= cutoff)
+        .group_by(JournalLine.account_id)
+    ).all()
+
+    written = 0
+    for account_id, high in candidates:
+        line_id, balance = previous.get(account_id, (0, Decimal('0')))
+        if high <= line_id:
+            continue
+        delta, as_of = session.execute(
+            select(func.sum(_signed_amount), func.max(JournalLine.created_at))
+            .where(JournalLine.account_id == account_id, JournalLine.id > line_id, JournalLine.id <= high)
+        ).one()
+        session.add(BalanceCheckpoint(account_id=account_id, journal_line_id=high, balance=balance + (delta or 0), as_of=as_of))
+        written += 1
+    return written
+
+
+def open_checkpoints(session):
+    # Opening checkpoint for every account that has none: its current
+    # accounts.balance (plus hot slots) as of the newest journal line. Run once
+    # before switching to LEDGER_MODE=journal, with postings paused.
+    high = session.execute(select(func.max(JournalLine.id))).scalar() or 0
+    now = datetime.utcnow()
+    rows = session.execute(
+        select(Account.id, account_balance())
+        .where(~select(BalanceCheckpoint.account_id).where(BalanceCheckpoint.account_id == Account.id).exists())
+    ).all()
+    if rows:
+        session.execute(insert(BalanceCheckpoint), [
+            {'account_id': account_id, 'journal_line_id': high, 'balance': balance, 'as_of': now}
+            for account_id, balance in rows
+        ])
+    return len(rows)
+
+
+def reconcile(session):
+    # Accounts whose maintained balance disagrees with the journal, as
+    # (account_id, balance, journal balance); meaningful in balance mode
+    return session.execute(
+        select(Account.id, account_balance(), journal_balance(Account.id))
+        .where(account_balance() != journal_balance(Account.id))
+        .order_by(Account.id)
+    ).all()
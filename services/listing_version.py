@@ -0,0 +1,32 @@
+import hashlib
+from collections import namedtuple
+from sqlalchemy import select, func, union_all
+from models.account import Account
+from models.transaction import Transaction
+from services.journal import balance_column
+
+# A cheap fingerprint of everything the account and transaction listings show
+# for a user. Any account change bumps updated_at (or the count, for deletes)
+# and any posting adds a transaction with a higher id.
+ListingVersion = namedtuple('ListingVersion', ['account_count', 'balance_total', 'accounts_updated_at', 'latest_transaction_id'])
+
+
+def listing_version(session, user_id):
+    # One round trip: the account aggregate plus the newest transaction id on
+    # either side, each side served by its own account-id index
+    account_ids = select(Account.id).where(Account.user_id == user_id).scalar_subquery()
+    sides = union_all(
+        select(func.max(Transaction.id).label('id')).where(Transaction.from_account_id.in_(account_ids)),
+        select(func.max(Transaction.id).label('id')).where(Transaction.to_account_id.in_(account_ids))
+    ).subquery()
+    latest_transaction_id = select(func.max(sides.c.id)).scalar_subquery()
+    row = session.execute(select(
+        func.count(Account.id), func.sum(balance_column(Account.id)), func.max(Account.updated_at), latest_transaction_id
+    ).where(Account.user_id == user_id)).one()
+    return ListingVersion(*row)
+
+
+def listing_etag(user_id, version, *extra):
+    # extra: anything else the response depends on, e.g. the query string
+    parts = [str(user_id)] + [str(value) for value in version] + [str(value) for value in extra]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+
+# Per-process request metrics in Prometheus text format. Each gunicorn worker
+# keeps its own numbers, so scrape every worker or aggregate by instance.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Clients send this header to get a Server-Timing breakdown of their request
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'X-Server-Timing')
+SERVER_TIMING_ALWAYS = os.getenv('SERVER_TIMING_ALWAYS', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for labels, series in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series):
+                    cumulative += count
+                    le = _labels(self.labelnames, labels, [('le', _number(bound))])
+                    lines.append(f'{self.name}_bucket{le} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Time to build the response, by route.',
+                            ('method', 'route'))
+REQUESTS = Counter('http_requests_total', 'Responses sent, by route and status.', ('method', 'route', 'status'))
+REQUEST_QUERIES = Histogram('http_request_sql_queries', 'SQL statements executed per request, by route.',
+                            ('method', 'route'), buckets=QUERY_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram('http_request_sql_duration_seconds', 'SQL time per request, by route.',
+                                ('method', 'route'))
+SQL_SECONDS = Histogram('sql_statement_duration_seconds', 'Time per SQL statement, by database.', ('database',))
+TEMPLATE_SECONDS = Histogram('template_render_duration_seconds', 'Template render time, by template.',
+                             ('template',))
+HASH_SECONDS = Histogram('password_hash_duration_seconds', 'Password hash and verify time as seen by the caller.',
+                         ('operation',), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+REGISTRY = [REQUEST_SECONDS, REQUESTS, REQUEST_QUERIES, REQUEST_SQL_SECONDS, SQL_SECONDS, TEMPLATE_SECONDS,
+            HASH_SECONDS]
+
+
+def _request_timings():
+    # Per-request accumulators; None outside a request (scripts, background work)
+    if not has_request_context():
+        return None
+    return g.get('request_timings')
+
+
+def add_request_time(key, seconds):
+    timings = _request_timings()
+    if timings is not None:
+        timings[key] = timings.get(key, 0.0) + seconds
+
+
+def observe_hash(operation, seconds):
+    HASH_SECONDS.observe(seconds, operation)
+    add_request_time('hash', seconds)
+
+
+_instrumented = set()
+
+
+def instrument_engine(engine, database='primary'):
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        SQL_SECONDS.observe(elapsed, database)
+        timings = _request_timings()
+        if timings is not None:
+            timings['sql'] = timings.get('sql', 0.0) + elapsed
+            timings['queries'] = timings.get('queries', 0) + 1
+
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('template_started', []).append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    started = g.get('template_started') if has_request_context() else None
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    TEMPLATE_SECONDS.observe(elapsed, template.name or 'string')
+    # Nested renders (includes via render_template) are already inside the outer one
+    if not started:
+        add_request_time('template', elapsed)
+
+
+def _start_request():
+    g.request_timings = {'started': time.perf_counter()}
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _finish_request(response):
+    # Timed up to the response object: streamed bodies and the teardown commit
+    # run after this
+    timings = g.pop('request_timings', None)
+    if timings is None:
+        return response
+    elapsed = time.perf_counter() - timings['started']
+    labels = (request.method, _route())
+    REQUEST_SECONDS.observe(elapsed, *labels)
+    REQUESTS.inc(*labels, str(response.status_code))
+    REQUEST_QUERIES.observe(timings.get('queries', 0), *labels)
+    REQUEST_SQL_SECONDS.observe(timings.get('sql', 0.0), *labels)
+
+    if SERVER_TIMING_ALWAYS or request.headers.get(SERVER_TIMING_HEADER, '').lower() in ('1', 'true', 'yes'):
+        parts = [f'app;dur={elapsed * 1000:.2f}',
+                 f'db;dur={timings.get("sql", 0.0) * 1000:.2f};desc="{timings.get("queries", 0)} queries"']
+        if 'template' in timings:
+            parts.append(f'tpl;dur={timings["template"] * 1000:.2f}')
+        if 'hash' in timings:
+            parts.append(f'hash;dur={timings["hash"] * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(parts)
+    return response
+
+
+def init_app(app):
+    from connector.db import engine, replicas
+    instrument_engine(engine)
+    for replica in replicas:
+        instrument_engine(replica.engine, 'replica')
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+
+def _gauges(prefix, stats):
+    lines = []
+    for key, value in sorted(stats.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f'# TYPE {prefix}_{key} gauge')
+        lines.append(f'{prefix}_{key} {_number(value)}')
+    return lines
+
+
+def render(extra_gauges=()):
+    # extra_gauges: (prefix, stats dict) pairs, e.g. the pool counters
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for prefix, stats in extra_gauges:
+        lines.extend(_gauges(prefix, stats))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from sqlalchemy.util import await_only
+from werkzeug.security import generate_password_hash, check_password_hash
+from connector.async_db import on_event_loop
+from services import metrics
+
+# PBKDF2 runs in a small dedicated process pool so a login burst cannot tie up
+# every request thread. HASH_POOL_SIZE=0 hashes inline on the request thread.
+HASH_POOL_SIZE = int(os.getenv('HASH_POOL_SIZE', min(os.cpu_count() or 1, 4)))
+HASH_QUEUE_DEPTH = int(os.getenv('HASH_QUEUE_DEPTH', HASH_POOL_SIZE * 4))
+HASH_TIMEOUT_SECONDS = float(os.getenv('HASH_TIMEOUT_SECONDS', 10))
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# Hashes running plus hashes waiting for a worker
+_slots = threading.BoundedSemaphore(max(HASH_POOL_SIZE, 1) + HASH_QUEUE_DEPTH)
+
+_stats_lock = threading.Lock()
+_stats = {
+    'hashes': 0,
+    'rejected': 0,
+    'timeouts': 0,
+    'in_flight': 0,
+    'queue_wait_seconds_total': 0.0,
+    'queue_wait_seconds_max': 0.0,
+    'hash_seconds_total': 0.0,
+}
+
+
+def _get_executor():
+    # One pool per process: a pool inherited across fork has dead workers
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=HASH_POOL_SIZE,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _timed(fn, *args):
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+def _record(queue_wait, hash_time):
+    with _stats_lock:
+        _stats['hashes'] += 1
+        _stats['queue_wait_seconds_total'] += queue_wait
+        _stats['queue_wait_seconds_max'] = max(_stats['queue_wait_seconds_max'], queue_wait)
+        _stats['hash_seconds_total'] += hash_time
+
+
+def _bump(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def _run(fn, *args):
+    if HASH_POOL_SIZE <= 0:
+        result, started, finished = _timed(fn, *args)
+        _record(0.0, finished - started)
+        return result
+
+    # Fail fast instead of queueing without bound; the app maps this to 503
+    if not _slots.acquire(blocking=False):
+        _bump('rejected')
+        raise HashPoolBusy("Password hashing is at capacity")
+    _bump('in_flight')
+    try:
+        submitted = time.time()
+        future = _get_executor().submit(_timed, fn, *args)
+        try:
+            result, started, finished = _wait(future)
+        except FutureTimeout:
+            future.cancel()
+            _bump('timeouts')
+            raise HashPoolBusy("Password hashing timed out")
+        _record(max(started - submitted, 0.0), finished - started)
+        return result
+    finally:
+        _bump('in_flight', -1)
+        _slots.release()
+
+
+def _wait(future):
+    if on_event_loop():
+        # Async serving mode runs the view in SQLAlchemy's greenlet on the event
+        # loop: yield to the loop while the hash runs instead of blocking it
+        return await_only(asyncio.wait_for(asyncio.wrap_future(future), HASH_TIMEOUT_SECONDS))
+    return future.result(timeout=HASH_TIMEOUT_SECONDS)
+
+
+def _observed(operation, fn, *args):
+    # Wall time as the request sees it, queue wait included
+    started = time.perf_counter()
+    try:
+        return _run(fn, *args)
+    finally:
+        metrics.observe_hash(operation, time.perf_counter() - started)
+
+
+def hash_password(password):
+    return _observed('hash', generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    return _observed('verify', check_password_hash, password_hash, password)
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot['pool_size'] = HASH_POOL_SIZE
+    snapshot['queue_depth_limit'] = HASH_QUEUE_DEPTH
+    return snapshot
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
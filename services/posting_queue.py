@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from sqlalchemy.exc import OperationalError
+from services.balance_service import post_batch, BalanceError
+from services.journal import recorded_postings
+
+# Write-behind posting. With POSTING_QUEUE enabled, create_transaction only
+# validates a request and appends it to a local SQLite log (WAL, synchronous
+# FULL, so an accepted posting survives a crash); the caller gets its id back
+# as pending. One applier process (scripts/posting_applier.py) drains the log
+# in batches through post_batch, one commit per batch, so the account rows see
+# a single writer instead of every worker at once.
+#
+# The log is a file on the web host: the applier has to run on the same host.
+POSTING_QUEUE_ENABLED = os.getenv('POSTING_QUEUE', 'false').lower() in ('1', 'true', 'yes')
+POSTING_QUEUE_PATH = os.getenv('POSTING_QUEUE_PATH', 'posting_queue.sqlite3')
+POSTING_QUEUE_BATCH = int(os.getenv('POSTING_QUEUE_BATCH', 500))
+# A posting that fails this many batches is rejected with its last error, so
+# one bad entry cannot hold up the postings behind it
+POSTING_QUEUE_MAX_ATTEMPTS = int(os.getenv('POSTING_QUEUE_MAX_ATTEMPTS', 5))
+# Applied and rejected entries stay pollable this long
+POSTING_QUEUE_RETENTION_SECONDS = float(os.getenv('POSTING_QUEUE_RETENTION_SECONDS', 86400))
+
+PENDING, APPLIED, REJECTED = 'pending', 'applied', 'rejected'
+
+_local = threading.local()
+
+
+def _connect(path=None):
+    # One connection per thread; every statement below is its own transaction
+    path = path or POSTING_QUEUE_PATH
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path not in connections:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id TEXT NOT NULL UNIQUE,"
+            " user_id TEXT NOT NULL,"
+            " item TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " enqueued_at REAL NOT NULL,"
+            " finished_at REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(postings)")}
+        if 'attempts' not in columns:
+            # Logs written before attempts were tracked
+            connection.execute("ALTER TABLE postings ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_postings_status ON postings (status, seq)")
+        connections[path] = connection
+    return connections[path]
+
+
+def enqueue(user_id, item, path=None):
+    # item: a batch item (type, amount, from/to_account_id, description),
+    # already validated by the caller. Returns the posting id.
+    posting_id = uuid.uuid4().hex
+    _connect(path).execute(
+        "INSERT INTO postings (id, user_id, item, status, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+        (posting_id, str(user_id), json.dumps(item), PENDING, time.time())
+    )
+    return posting_id
+
+
+def posting_status(posting_id, user_id, path=None):
+    # The posting's outcome for its owner, None for anyone else
+    row = _connect(path).execute(
+        "SELECT id, status, error, enqueued_at, finished_at FROM postings WHERE id = ? AND user_id = ?",
+        (posting_id, str(user_id))
+    ).fetchone()
+    if row is None:
+        return None
+    posting_id, status, error, enqueued_at, finished_at = row
+    result = {'id': posting_id, 'status': status, 'enqueued_at': enqueued_at, 'finished_at': finished_at}
+    if error:
+        result['error'] = error
+    return result
+
+
+def pending(limit=POSTING_QUEUE_BATCH, path=None):
+    # The oldest pending postings as (id, user_id, item)
+    return [
+        (posting_id, user_id, json.loads(item))
+        for posting_id, user_id, item in _connect(path).execute(
+            "SELECT id, user_id, item FROM postings WHERE status = ? ORDER BY seq LIMIT ?", (PENDING, limit)
+        )
+    ]
+
+
+def finish(outcomes, path=None):
+    # outcomes: (posting_id, status, error) for every posting of the batch.
+    # PENDING means it failed this time: it counts an attempt and is rejected
+    # with its error once it has used up POSTING_QUEUE_MAX_ATTEMPTS.
+    connection = _connect(path)
+    now = time.time()
+    settled = [(status, error, now, posting_id) for posting_id, status, error in outcomes if status != PENDING]
+    failed = [(error, posting_id) for posting_id, status, error in outcomes if status == PENDING]
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.executemany(
+            "UPDATE postings SET status = ?, error = ?, finished_at = ? WHERE id = ?", settled
+        )
+        connection.executemany(
+            "UPDATE postings SET attempts = attempts + 1, error = ? WHERE id = ?", failed
+        )
+        connection.executemany(
+            "UPDATE postings SET status = ?, finished_at = ? WHERE id = ? AND attempts >= ?",
+            [(REJECTED, now, posting_id, POSTING_QUEUE_MAX_ATTEMPTS) for _, posting_id in failed]
+        )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+
+def prune(retention=POSTING_QUEUE_RETENTION_SECONDS, path=None):
+    cursor = _connect(path).execute(
+        "DELETE FROM postings WHERE status != ? AND finished_at < ?", (PENDING, time.time() - retention)
+    )
+    return cursor.rowcount
+
+
+def apply_batch(session, batch):
+    # Applies one batch from pending() in a single DB transaction and returns
+    # the outcomes to finish(). Each user's postings go through post_batch in
+    # queue order under a savepoint: a user whose balances moved underneath
+    # stays pending (one attempt used) instead of failing the others.
+    # Postings already in the journal were committed by an applier that died
+    # before finish(); they are reported applied, not posted twice.
+    done = recorded_postings(session, [posting_id for posting_id, _, _ in batch])
+    by_user = OrderedDict()
+    outcomes = [(posting_id, APPLIED, None) for posting_id, _, _ in batch if posting_id in done]
+    for posting_id, user_id, item in batch:
+        if posting_id not in done:
+            by_user.setdefault(user_id, []).append((posting_id, item))
+
+    for user_id, postings in by_user.items():
+        posting_ids = [posting_id for posting_id, _ in postings]
+        try:
+            with session.begin_nested():
+                results = post_batch(session, user_id, [item for _, item in postings], posting_ids=posting_ids)
+        except BalanceError as e:
+            outcomes.extend((posting_id, PENDING, str(e)) for posting_id in posting_ids)
+            continue
+        outcomes.extend(
+            (posting_ids[result['index']], result['status'], result.get('error')) for result in results
+        )
+    session.commit()
+    return outcomes
+
+
+def apply_singly(session_factory, batch):
+    # After a whole batch failed: each posting in its own DB transaction, so
+    # only the posting that breaks uses up an attempt. Errors that mean the
+    # database itself is unavailable propagate and nobody is charged.
+    outcomes = []
+    for posting in batch:
+        try:
+            with session_factory() as session:
+                outcomes.extend(apply_batch(session, [posting]))
+        except OperationalError:
+            raise
+        except Exception as e:
+            outcomes.append((posting[0], PENDING, f"{type(e).__name__}: {e}"[:500]))
+    return outcomes
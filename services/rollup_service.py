@@ -0,0 +1,104 @@
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import func, select, literal, union_all
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models.transaction import Transaction
+from models.transaction_rollup import TransactionRollup
+
+GRANULARITIES = {'month': ('%Y-%m', 7), 'day': ('%Y-%m-%d', 10)}
+
+
+def rollup_deltas(transactions):
+    # transactions: dicts with type, from_account_id, to_account_id, amount, created_at.
+    # Returns one delta row per (account_id, period, type) for both granularities.
+    deltas = defaultdict(lambda: [0, Decimal('0'), Decimal('0')])
+    for txn in transactions:
+        for fmt, _ in GRANULARITIES.values():
+            period = txn['created_at'].strftime(fmt)
+            if txn.get('from_account_id'):
+                delta = deltas[(int(txn['from_account_id']), period, txn['type'])]
+                delta[0] += 1
+                delta[2] += txn['amount']
+            if txn.get('to_account_id'):
+                delta = deltas[(int(txn['to_account_id']), period, txn['type'])]
+                delta[0] += 1
+                delta[1] += txn['amount']
+    return [
+        {'account_id': account_id, 'period': period, 'type': txn_type, 'count': count, 'sum_in': sum_in, 'sum_out': sum_out}
+        for (account_id, period, txn_type), (count, sum_in, sum_out) in sorted(deltas.items())
+    ]
+
+
+def _upsert(dialect_name):
+    table = TransactionRollup.__table__
+    if dialect_name == 'mysql':
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(
+            count=table.c['count'] + stmt.inserted['count'],
+            sum_in=table.c.sum_in + stmt.inserted.sum_in,
+            sum_out=table.c.sum_out + stmt.inserted.sum_out,
+        )
+    stmt = (postgresql if dialect_name == 'postgresql' else sqlite).insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.account_id, table.c.period, table.c.type],
+        set_={
+            'count': table.c['count'] + stmt.excluded['count'],
+            'sum_in': table.c.sum_in + stmt.excluded.sum_in,
+            'sum_out': table.c.sum_out + stmt.excluded.sum_out,
+        }
+    )
+
+
+def record_rollups(session, transactions):
+    # Adds the transactions to their rollups inside the caller's DB transaction,
+    # so the rollups commit or roll back together with the postings
+    deltas = rollup_deltas(transactions)
+    if deltas:
+        session.execute(_upsert(session.get_bind().dialect.name), deltas)
+
+
+def period_expression(dialect_name, granularity):
+    fmt, _ = GRANULARITIES[granularity]
+    if dialect_name == 'mysql':
+        return func.date_format(Transaction.created_at, fmt)
+    if dialect_name == 'postgresql':
+        return func.to_char(Transaction.created_at, fmt.replace('%Y', 'YYYY').replace('%m', 'MM').replace('%d', 'DD'))
+    return func.strftime(fmt, Transaction.created_at)
+
+
+def backfill_rollups(connection):
+    # Rebuilds every rollup from the transactions table with INSERT ... SELECT,
+    # aggregating in the database rather than in Python
+    table = TransactionRollup.__table__
+    connection.execute(table.delete())
+    for granularity in GRANULARITIES:
+        period = period_expression(connection.dialect.name, granularity)
+        sides = union_all(
+            select(Transaction.from_account_id.label('account_id'), period.label('period'), Transaction.type.label('type'),
+                   literal(0).label('sum_in'), Transaction.amount.label('sum_out'))
+            .where(Transaction.from_account_id.isnot(None)),
+            select(Transaction.to_account_id.label('account_id'), period.label('period'), Transaction.type.label('type'),
+                   Transaction.amount.label('sum_in'), literal(0).label('sum_out'))
+            .where(Transaction.to_account_id.isnot(None)),
+        ).subquery()
+        connection.execute(table.insert().from_select(
+            ['account_id', 'period', 'type', 'count', 'sum_in', 'sum_out'],
+            select(sides.c.account_id, sides.c.period, sides.c.type, func.count(),
+                   func.sum(sides.c.sum_in), func.sum(sides.c.sum_out))
+            .group_by(sides.c.account_id, sides.c.period, sides.c.type)
+        ))
+
+
+def account_summary(session, account_ids, granularity='month', start=None, end=None):
+    # Statement lines per (account, period, type) read straight from the rollups:
+    # O(periods) rows regardless of how many transactions they cover
+    _, length = GRANULARITIES[granularity]
+    query = session.query(TransactionRollup).filter(
+        TransactionRollup.account_id.in_(account_ids),
+        func.length(TransactionRollup.period) == length
+    )
+    if start:
+        query = query.filter(TransactionRollup.period >= start[:length])
+    if end:
+        query = query.filter(TransactionRollup.period <= end[:length])
+    return query.order_by(TransactionRollup.account_id, TransactionRollup.period, TransactionRollup.type).all()
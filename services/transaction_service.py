@@ -0,0 +1,131 @@
+from collections import namedtuple
+from sqlalchemy import select, union_all, or_, and_
+from sqlalchemy.orm import aliased, joinedload
+from models.account import Account
+from models.transaction import Transaction
+from utils.pagination import Page, encode_cursor, decode_cursor
+
+# What the history pages show for a transaction: plain column values, with the
+# account numbers of both sides resolved in the same query
+TransactionRow = namedtuple('TransactionRow', [
+    'id', 'created_at', 'type', 'from_account_id', 'to_account_id', 'amount', 'description',
+    'from_account_number', 'to_account_number'
+])
+
+
+def user_account_ids(session, user_id, account_id=None):
+    # Resolve the user's account ids up front so the transaction lookups can use
+    # plain IN lists against the indexed from/to columns. Read from the database
+    # rather than the account cache: an ownership check must not trust a list
+    # another worker may have changed since it was cached.
+    query = select(Account.id).where(Account.user_id == user_id).order_by(Account.id)
+    if account_id:
+        try:
+            query = query.where(Account.id == int(account_id))
+        except (TypeError, ValueError):
+            return []
+    return list(session.execute(query).scalars())
+
+
+def transaction_criteria(start_date=None, end_date=None, transaction_type=None):
+    criteria = []
+    if start_date and end_date:
+        criteria.append(Transaction.created_at.between(start_date, end_date))
+    if transaction_type:
+        criteria.append(Transaction.type == transaction_type)
+    return criteria
+
+
+def matching_transaction_ids(account_ids, criteria, order_by=None, limit=None):
+    # One lookup per side of the transaction, each served by its
+    # (<side>_account_id, created_at) index, merged with UNION ALL. A transfer
+    # between two of the user's accounts shows up on both sides; callers dedupe
+    # by selecting through Transaction.id IN (...).
+    sides = []
+    for column in (Transaction.from_account_id, Transaction.to_account_id):
+        side = select(Transaction.id).where(column.in_(account_ids), *criteria)
+        if order_by is not None:
+            side = side.order_by(*order_by).limit(limit)
+        # Wrapped so per-branch ORDER BY/LIMIT is legal on SQLite as well
+        sides.append(select(side.subquery()))
+    return union_all(*sides).subquery()
+
+
+def export_statement(session, user_id, account_id=None, start_date=None, end_date=None, transaction_type=None):
+    # Every matching transaction, oldest first, as plain column rows. Meant to be
+    # executed with stream_results/yield_per so rows are fetched incrementally.
+    account_ids = user_account_ids(session, user_id, account_id)
+    matched = matching_transaction_ids(account_ids, transaction_criteria(start_date, end_date, transaction_type))
+    return select(
+        Transaction.id, Transaction.created_at, Transaction.type, Transaction.from_account_id,
+        Transaction.to_account_id, Transaction.amount, Transaction.description
+    ).where(Transaction.id.in_(select(matched.c.id))).order_by(Transaction.created_at, Transaction.id)
+
+
+def paginate_transactions(session, user_id, limit, cursor=None, account_id=None, start_date=None, end_date=None, transaction_type=None):
+    # Keyset pagination on (created_at, id), newest first. Each side of the UNION
+    # is cut at limit + 1 rows, so the cost of a page does not grow with the
+    # history size.
+    criteria = transaction_criteria(start_date, end_date, transaction_type)
+    direction = 'next'
+    if cursor:
+        created_at, row_id, direction = decode_cursor(cursor)
+        if direction == 'next':
+            criteria.append(or_(
+                Transaction.created_at < created_at,
+                and_(Transaction.created_at == created_at, Transaction.id < row_id)
+            ))
+        else:
+            criteria.append(or_(
+                Transaction.created_at > created_at,
+                and_(Transaction.created_at == created_at, Transaction.id > row_id)
+            ))
+
+    if direction == 'next':
+        order_by = (Transaction.created_at.desc(), Transaction.id.desc())
+    else:
+        order_by = (Transaction.created_at.asc(), Transaction.id.asc())
+
+    account_ids = user_account_ids(session, user_id, account_id)
+    matched = matching_transaction_ids(account_ids, criteria, order_by, limit + 1)
+    # Column rows instead of ORM entities: no identity map or relationship
+    # state per row, and both account numbers come back in the same statement
+    from_account, to_account = aliased(Account), aliased(Account)
+    statement = select(
+        Transaction.id, Transaction.created_at, Transaction.type, Transaction.from_account_id,
+        Transaction.to_account_id, Transaction.amount, Transaction.description,
+        from_account.account_number, to_account.account_number
+    ).outerjoin(
+        from_account, Transaction.from_account_id == from_account.id
+    ).outerjoin(
+        to_account, Transaction.to_account_id == to_account.id
+    ).where(
+        Transaction.id.in_(select(matched.c.id))
+    ).order_by(*order_by).limit(limit + 1)
+    rows = [TransactionRow(*row) for row in session.execute(statement)]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'prev':
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        # Coming back from an older page there is always a next page
+        if direction == 'prev' or has_more:
+            next_cursor = encode_cursor(last.created_at, last.id, 'next')
+        if cursor and (direction == 'next' or has_more):
+            prev_cursor = encode_cursor(first.created_at, first.id, 'prev')
+    return Page(rows, next_cursor, prev_cursor, limit)
+
+
+def get_user_transaction(session, user_id, transaction_id):
+    # Primary-key lookup; ownership is checked against the resolved account ids
+    account_ids = user_account_ids(session, user_id)
+    return session.query(Transaction).options(
+        joinedload(Transaction.from_account), joinedload(Transaction.to_account)
+    ).filter(
+        Transaction.id == transaction_id,
+        or_(Transaction.from_account_id.in_(account_ids), Transaction.to_account_id.in_(account_ids))
+    ).first()
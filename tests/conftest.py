@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+# The app builds its engine from the environment at import time
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault('DB_STRICT_LOADING', 'true')
+os.environ.setdefault('APIDOCS_ENABLED', 'false')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    from connector.db import Base, engine
+    import models.transaction_rollup  # noqa: F401
+    import models.revoked_grant  # noqa: F401
+    import models.grant_spend  # noqa: F401
+    import models.account_balance_slot  # noqa: F401
+    import models.journal_line  # noqa: F401
+    import models.balance_checkpoint  # noqa: F401
+    app.config['TESTING'] = True
+    Base.metadata.create_all(engine)
+    return app
+
+
+@pytest.fixture
+def user(app):
+    # A user with two accounts and a logged-in test client
+    from flask_jwt_extended import create_access_token
+    from connector.db import Session
+    from models.account import Account
+    from models.user import User
+
+    suffix = os.urandom(4).hex()
+    with Session() as session:
+        user = User(username=f'user-{suffix}', email=f'{suffix}@test.local')
+        user.set_password('secret')
+        session.add(user)
+        session.flush()
+        accounts = [Account(user_id=user.id, account_type='checking', account_number=f'{suffix}-{n}', balance=100)
+                    for n in range(2)]
+        session.add_all(accounts)
+        session.commit()
+        user_id, account_ids = user.id, [account.id for account in accounts]
+
+    client = app.test_client()
+    with app.app_context():
+        client.set_cookie('access_token_cookie', create_access_token(identity=str(user_id)))
+    return {'id': user_id, 'accounts': account_ids, 'client': client}
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+
+def balances(account_ids):
+    from connector.db import Session
+    from models.account import Account
+    with Session() as session:
+        return dict(session.execute(select(Account.id, Account.balance).where(Account.id.in_(account_ids))).all())
+
+
+def test_debit_refuses_overdraft(user):
+    # The conditional UPDATE matches no row, so nothing changes
+    from connector.db import Session
+    from services.balance_service import debit, InsufficientFunds
+    source, _ = user['accounts']
+    with Session() as session:
+        with pytest.raises(InsufficientFunds):
+            debit(session, user['id'], source, Decimal('100.01'))
+        session.commit()
+    assert balances([source])[source] == Decimal('100.00')
+
+
+def test_debit_can_empty_the_account(user):
+    from connector.db import Session
+    from services.balance_service import debit
+    source, _ = user['accounts']
+    with Session() as session:
+        debit(session, user['id'], source, Decimal('100.00'))
+        session.commit()
+    assert balances([source])[source] == Decimal('0.00')
+
+
+def test_debit_refuses_someone_elses_account(user):
+    from connector.db import Session
+    from services.balance_service import debit, InvalidAccount
+    source, _ = user['accounts']
+    with Session() as session:
+        with pytest.raises(InvalidAccount):
+            debit(session, user['id'] + 1000000, source, Decimal('1.00'))
+    assert balances([source])[source] == Decimal('100.00')
+
+
+def test_overdrawn_transfer_leaves_both_sides_alone(user):
+    from connector.db import Session
+    from services.balance_service import post_transaction, InsufficientFunds
+    source, target = user['accounts']
+    with Session() as session:
+        with pytest.raises(InsufficientFunds):
+            post_transaction(session, str(user['id']), 'transfer', Decimal('150.00'),
+                             from_account_id=source, to_account_id=target)
+        session.rollback()
+    assert balances(user['accounts']) == {source: Decimal('100.00'), target: Decimal('100.00')}
@@ -0,0 +1,71 @@
+import os
+import threading
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Lock-order deadlocks need row-level locks; SQLite serializes every writer on
+# the file, so these run only against a MySQL or PostgreSQL database
+LOCKING_DATABASE_URL = os.getenv('LOCKING_DATABASE_URL')
+
+
+@pytest.mark.skipif(not LOCKING_DATABASE_URL, reason='set LOCKING_DATABASE_URL to a MySQL or PostgreSQL database')
+def test_batch_and_transfer_into_hot_account_do_not_deadlock(app):
+    from connector.db import Base
+    from models.account import Account
+    from models.user import User
+    from services.balance_service import post_batch, post_transaction
+    from services.hot_accounts import set_hot, forget_hot_accounts
+
+    engine = create_engine(LOCKING_DATABASE_URL)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    suffix = os.urandom(4).hex()
+    with Session() as session:
+        user = User(username=f'lock-{suffix}', email=f'lock-{suffix}@test.local', password_hash='-')
+        session.add(user)
+        session.flush()
+        low, high = (Account(user_id=user.id, account_type='checking', account_number=f'lock-{suffix}-{n}',
+                             balance=100000) for n in range(2))
+        session.add_all([low, high])
+        session.flush()
+        # Only the higher id is hot: the batch used to fold it before locking the lower one
+        set_hot(session, high.id, 4)
+        session.commit()
+        user_id, low_id, high_id = str(user.id), low.id, high.id
+    forget_hot_accounts()
+
+    errors = []
+    rounds = 200
+
+    def batches():
+        for _ in range(rounds):
+            with Session() as session:
+                try:
+                    post_batch(session, user_id, [
+                        {'type': 'withdrawal', 'from_account_id': low_id, 'amount': '1'},
+                        {'type': 'deposit', 'to_account_id': high_id, 'amount': '1'},
+                    ])
+                    session.commit()
+                except Exception as e:
+                    errors.append(e)
+
+    def transfers():
+        for _ in range(rounds):
+            with Session() as session:
+                try:
+                    post_transaction(session, user_id, 'transfer', Decimal('1'),
+                                     from_account_id=low_id, to_account_id=high_id)
+                    session.commit()
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=batches), threading.Thread(target=transfers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    assert errors == []
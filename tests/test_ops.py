@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.mark.parametrize('path', ['/ops/db-pool', '/ops/hash-pool', '/ops/cache', '/metrics'])
+def test_ops_endpoints_need_the_ops_token(app, monkeypatch, path):
+    from utils import ops_auth
+    client = app.test_client()
+    monkeypatch.setattr(ops_auth, 'OPS_TOKEN', '')
+    assert client.get(path).status_code == 404
+
+    monkeypatch.setattr(ops_auth, 'OPS_TOKEN', 'ops-secret')
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get(path, headers={'Authorization': 'Bearer ops-secret'}).status_code == 200
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def test_cursor_round_trips():
+    from utils.pagination import encode_cursor, decode_cursor
+    created_at = datetime(2024, 1, 15, 10, 30, 5, 123456)
+    for direction in ('next', 'prev'):
+        assert decode_cursor(encode_cursor(created_at, 42, direction)) == (created_at, 42, direction)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', 'WzEsMiwzXQ'])
+def test_malformed_cursor_is_a_value_error(cursor):
+    from utils.pagination import decode_cursor
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_walk_forward_and_back_over_ties(user):
+    # Five transactions share a timestamp, so paging has to break ties on id
+    from connector.db import Session
+    from models.transaction import Transaction
+    from services.transaction_service import paginate_transactions
+    source, target = user['accounts']
+    tied = datetime(2024, 1, 15, 10, 30)
+    with Session() as session:
+        session.add_all(Transaction(from_account_id=source, to_account_id=target, amount=1, type='transfer',
+                                    created_at=tied if n < 5 else tied - timedelta(minutes=n)) for n in range(7))
+        session.commit()
+
+        first = paginate_transactions(session, user['id'], 3)
+        second = paginate_transactions(session, user['id'], 3, first.next_cursor)
+        third = paginate_transactions(session, user['id'], 3, second.next_cursor)
+        ids = [row.id for page in (first, second, third) for row in page.items]
+        assert len(ids) == len(set(ids)) == 7
+        assert third.next_cursor is None
+
+        back = paginate_transactions(session, user['id'], 3, second.prev_cursor)
+        assert [row.id for row in back.items] == [row.id for row in first.items]
+        assert back.prev_cursor is None
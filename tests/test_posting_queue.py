@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from sqlalchemy import select
+
+
+def balances(account_ids):
+    from connector.db import Session
+    from models.account import Account
+    with Session() as session:
+        return dict(session.execute(select(Account.id, Account.balance).where(Account.id.in_(account_ids))).all())
+
+
+def test_applier_crash_before_finish_does_not_post_twice(user, tmp_path):
+    # The batch committed but the applier died before finish(): the postings
+    # are still pending in the log, and the journal says they were applied
+    from connector.db import Session
+    from services import posting_queue
+    path = str(tmp_path / 'posting_queue.sqlite3')
+    source, target = user['accounts']
+    posting_id = posting_queue.enqueue(user['id'], {
+        'type': 'transfer', 'amount': '10.00', 'from_account_id': source, 'to_account_id': target
+    }, path)
+
+    batch = posting_queue.pending(path=path)
+    with Session() as session:
+        assert posting_queue.apply_batch(session, batch) == [(posting_id, posting_queue.APPLIED, None)]
+    assert posting_queue.pending(path=path) == batch
+
+    with Session() as session:
+        outcomes = posting_queue.apply_batch(session, posting_queue.pending(path=path))
+    posting_queue.finish(outcomes, path)
+
+    assert outcomes == [(posting_id, posting_queue.APPLIED, None)]
+    assert posting_queue.posting_status(posting_id, user['id'], path)['status'] == posting_queue.APPLIED
+    assert balances(user['accounts']) == {source: Decimal('90.00'), target: Decimal('110.00')}
+
+
+def test_failing_posting_is_rejected_after_max_attempts(user, tmp_path, monkeypatch):
+    from services import posting_queue
+    monkeypatch.setattr(posting_queue, 'POSTING_QUEUE_MAX_ATTEMPTS', 2)
+    path = str(tmp_path / 'posting_queue.sqlite3')
+    posting_id = posting_queue.enqueue(user['id'], {'type': 'deposit', 'amount': '1.00'}, path)
+    for _ in range(2):
+        posting_queue.finish([(posting_id, posting_queue.PENDING, 'boom')], path)
+    status = posting_queue.posting_status(posting_id, user['id'], path)
+    assert (status['status'], status['error']) == (posting_queue.REJECTED, 'boom')
+    assert posting_queue.pending(path=path) == []
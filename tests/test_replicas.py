@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+from sqlalchemy import text, update
+
+
+def database_file(session):
+    # The file the session's SELECTs are answered from
+    return os.path.basename(session.execute(text("PRAGMA database_list")).first()[2])
+
+
+@pytest.fixture
+def replica(app, monkeypatch, tmp_path):
+    # A second SQLite file standing in for a read replica
+    from connector import db
+    replica = db.Replica(f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(db, 'replicas', [replica])
+    yield replica
+    replica.engine.dispose()
+
+
+def test_read_only_session_reads_from_replica(replica):
+    from connector.db import Session
+    with Session(info={'read_only': True}) as session:
+        assert database_file(session) == 'replica.db'
+    with Session() as session:
+        assert database_file(session) == 'test.db'
+
+
+def test_writes_go_to_primary(replica):
+    from connector.db import Session, engine
+    from models.account import Account
+    with Session(info={'read_only': True}) as session:
+        assert session.get_bind(clause=update(Account).values(balance=0)) is engine
+        assert session.get_bind(clause=text("SELECT 1")) is replica.engine
+
+
+def test_unhealthy_replica_falls_back_to_primary(app, monkeypatch, tmp_path):
+    from connector import db
+    dead = db.Replica(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(db, 'replicas', [dead])
+    with db.Session(info={'read_only': True}) as session:
+        assert database_file(session) == 'test.db'
+    assert dead.healthy is False
+
+
+def test_only_reads_without_a_recent_write_use_replicas(app, replica):
+    from flask import session as flask_session
+    from connector.db import _reads_from_replica, STICKY_KEY
+    with app.test_request_context('/accounts/accounts', method='GET'):
+        assert _reads_from_replica()
+        flask_session[STICKY_KEY] = time.time() + 5
+        assert not _reads_from_replica()
+    with app.test_request_context('/transactions/transactions', method='POST'):
+        assert not _reads_from_replica()
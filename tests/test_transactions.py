@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from sqlalchemy import select
+
+
+def balances(account_ids):
+    from connector.db import Session
+    from models.account import Account
+    with Session() as session:
+        return dict(session.execute(select(Account.id, Account.balance).where(Account.id.in_(account_ids))).all())
+
+
+def test_create_transaction_posts_transfer(user):
+    # ORM UPDATE/INSERT statements used to trip the lazy-load guard and 500
+    source, target = user['accounts']
+    response = user['client'].post('/transactions/transactions', data={
+        'type': 'transfer', 'from_account_id': source, 'to_account_id': target,
+        'amount': '25.00', 'confirm_password': 'secret'
+    })
+    assert response.status_code == 302
+    assert balances(user['accounts']) == {source: Decimal('75.00'), target: Decimal('125.00')}
+
+
+def test_batch_negative_amounts_do_not_shrink_grant_total(user):
+    # A rejected negative item must not offset the total the grant has to cover
+    from services import grant_service
+    source, target = user['accounts']
+    client = user['client']
+    client.post('/transactions/transactions', data={
+        'type': 'deposit', 'to_account_id': target, 'amount': '1.00', 'confirm_password': 'secret'
+    })
+    ceiling = grant_service.GRANT_MAX_AMOUNT
+    response = client.post('/transactions/transactions/batch', json={'transactions': [
+        {'type': 'transfer', 'from_account_id': source, 'to_account_id': target, 'amount': str(ceiling * 5)},
+        {'type': 'deposit', 'to_account_id': target, 'amount': str(-ceiling * 5)},
+    ]})
+    assert response.status_code == 401
+
+
+def test_create_transaction_rejects_non_numeric_account(user):
+    source, _ = user['accounts']
+    response = user['client'].post('/transactions/transactions', data={
+        'type': 'transfer', 'from_account_id': source, 'to_account_id': 'abc',
+        'amount': '1.00', 'confirm_password': 'secret'
+    })
+    assert response.status_code == 302
+    assert balances(user['accounts'])[source] == Decimal('100.00')
+
+
+def test_grant_ceiling_caps_total_across_postings(user, monkeypatch):
+    # The ceiling bounds what one grant authorizes in all, not each posting
+    from services import grant_service
+    monkeypatch.setattr(grant_service, 'GRANT_MAX_AMOUNT', Decimal('30.00'))
+    source, target = user['accounts']
+    client = user['client']
+    client.post('/transactions/transactions', data={
+        'type': 'deposit', 'to_account_id': target, 'amount': '1.00', 'confirm_password': 'secret'
+    })
+    for amount in ('20.00', '20.00'):
+        client.post('/transactions/transactions', data={'type': 'deposit', 'to_account_id': target, 'amount': amount})
+    assert balances(user['accounts'])[target] == Decimal('121.00')
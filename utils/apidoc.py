@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import os
+
+# Swagger UI and /apispec_1.json are optional. Route modules attach their spec
+# dicts with the swag_from below, so nothing imports flasgger unless the docs are
+# enabled, and the spec is built once per code version instead of per request.
+APIDOCS_ENABLED = os.getenv('APIDOCS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+APISPEC_CACHE_DIR = os.getenv('APISPEC_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.apispec'))
+SOURCE_DIRS = ('controller',)
+
+logger = logging.getLogger(__name__)
+
+
+def swag_from(specs):
+    # Same attribute flasgger's swag_from sets for dict specs; flasgger reads it
+    # back when it builds the spec, so the view itself is left unwrapped
+    def decorator(function):
+        function.specs_dict = specs
+        return function
+    return decorator
+
+
+def code_version():
+    # Hash of the route modules plus the flasgger version: any change to a route
+    # or its spec dict gives a new cache file
+    from importlib.metadata import version, PackageNotFoundError
+    digest = hashlib.sha1()
+    root = os.path.dirname(os.path.dirname(__file__))
+    paths = [os.path.join(root, 'app.py')]
+    for directory in SOURCE_DIRS:
+        paths.extend(sorted(os.path.join(root, directory, name) for name in os.listdir(os.path.join(root, directory))
+                            if name.endswith('.py')))
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    try:
+        digest.update(version('flasgger').encode())
+    except PackageNotFoundError:
+        pass
+    return digest.hexdigest()[:16]
+
+
+def spec_cache_path(endpoint):
+    return os.path.join(APISPEC_CACHE_DIR, f"{endpoint}-{code_version()}.json")
+
+
+def init_app(app):
+    # Returns the Swagger instance, or None when the docs are disabled
+    app.config.setdefault('APIDOCS_ENABLED', APIDOCS_ENABLED)
+    if not app.config['APIDOCS_ENABLED']:
+        return None
+    from flasgger import Swagger
+
+    class CachedSwagger(Swagger):
+        # Flasgger re-walks every route on each spec request; build it once per
+        # process, from the file written at build time when there is one
+        _spec_cache = {}
+
+        def get_apispecs(self, endpoint='apispec_1'):
+            spec = self._spec_cache.get(endpoint)
+            if spec is None:
+                spec = self._spec_cache[endpoint] = load_or_build_spec(endpoint, lambda: self.build_apispecs(endpoint))
+            return spec
+
+        def build_apispecs(self, endpoint='apispec_1'):
+            return Swagger.get_apispecs(self, endpoint)
+
+    return CachedSwagger(app)
+
+
+def load_or_build_spec(endpoint, build):
+    path = spec_cache_path(endpoint)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    spec = build()
+    try:
+        write_spec(path, spec)
+    except OSError as e:
+        logger.warning("Could not cache the API spec at %s: %s", path, e)
+    return spec
+
+
+def write_spec(path, spec):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written aside and renamed, so a concurrently booting worker never reads half a file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(spec, f, default=str)
+    os.replace(tmp_path, path)
@@ -0,0 +1,21 @@
+from flask import request, current_app, session as flask_session
+
+
+def set_validators(response, etag):
+    # private: the page is per user; no-cache: always revalidate before reuse.
+    # No Last-Modified: accounts.updated_at has one-second resolution and does
+    # not move for every posting, so only the ETag is a safe validator.
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag):
+    # A bare 304 when the client's validators still match, otherwise None.
+    # Pages with pending flash messages always render, or the messages would be
+    # left sitting in the session.
+    if '_flashes' in flask_session:
+        return None
+    if not request.if_none_match.contains(etag):
+        return None
+    return set_validators(current_app.response_class(status=304), etag)
@@ -0,0 +1,35 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app
+
+# orjson when it is installed, the stdlib otherwise; both give the same output.
+# Decimals are written as strings so amounts round-trip exactly.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    if orjson is not None:
+        # orjson writes naive datetimes exactly like isoformat()
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(payload, status=200, headers=None):
+    return current_app.response_class(dumps(payload), status=status, headers=headers, mimetype='application/json')
+
+
+def error_response(status, code, message, headers=None):
+    # The one error body shape the JSON API uses
+    return json_response({'error': {'code': code, 'message': message}}, status, headers)
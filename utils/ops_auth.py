@@ -0,0 +1,17 @@
+import hmac
+import os
+from flask import request, abort
+
+# The /ops endpoints and /metrics describe the process (pool sizes, hash
+# queue, cache hit rates). They answer only to `Authorization: Bearer
+# <OPS_TOKEN>`; with OPS_TOKEN unset they do not exist at all.
+OPS_TOKEN = os.getenv('OPS_TOKEN', '')
+
+
+def require_ops_token():
+    # before_request hook for the ops blueprints
+    if not OPS_TOKEN:
+        abort(404)
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), OPS_TOKEN.encode()):
+        abort(401)
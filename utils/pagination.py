@@ -0,0 +1,35 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# A page of keyset-paginated results plus the cursors to move around it
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor', 'limit'])
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        limit = int(value) if value else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(created_at, row_id, direction='next'):
+    payload = json.dumps([created_at.isoformat(), row_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Returns (created_at, id, direction); raises ValueError for anything malformed
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(row_id), direction
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e